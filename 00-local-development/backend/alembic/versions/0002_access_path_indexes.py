@@ -0,0 +1,39 @@
+"""Composite indexes for the hot list and relationship queries
+
+- tasks (created_at, id)               GET /tasks, keyset order
+- tasks (status, created_at, id)       GET /tasks?status=...
+- tasks (assignee_id, created_at, id)  GET /tasks?assignee_id=..., User.tasks_assigned
+- tasks (creator_id)                   User.tasks_created
+- attachments (task_id)                GET /tasks/{id}/attachments, Task.attachments
+- users (is_active, created_at, id)    GET /users, keyset order
+
+Revision ID: 0002_access_path_indexes
+Revises: 0001_initial_schema
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_access_path_indexes"
+down_revision = "0001_initial_schema"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_tasks_created_at_id", "tasks", ["created_at", "id"])
+    op.create_index("ix_tasks_status_created_at_id", "tasks", ["status", "created_at", "id"])
+    op.create_index("ix_tasks_assignee_id_created_at_id", "tasks", ["assignee_id", "created_at", "id"])
+    op.create_index("ix_tasks_creator_id", "tasks", ["creator_id"])
+    op.create_index("ix_attachments_task_id", "attachments", ["task_id"])
+    op.create_index("ix_users_is_active_created_at_id", "users", ["is_active", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_is_active_created_at_id", table_name="users")
+    op.drop_index("ix_attachments_task_id", table_name="attachments")
+    op.drop_index("ix_tasks_creator_id", table_name="tasks")
+    op.drop_index("ix_tasks_assignee_id_created_at_id", table_name="tasks")
+    op.drop_index("ix_tasks_status_created_at_id", table_name="tasks")
+    op.drop_index("ix_tasks_created_at_id", table_name="tasks")
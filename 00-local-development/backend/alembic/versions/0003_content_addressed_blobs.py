@@ -0,0 +1,47 @@
+"""Content-addressed blobs for deduplicated attachments
+
+Adds the blobs table (one row per unique file content, with a reference
+count) and attachments.blob_sha256 pointing at it. Existing attachments keep
+blob_sha256 NULL and own their file as before.
+
+Revision ID: 0003_content_addressed_blobs
+Revises: 0002_access_path_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_content_addressed_blobs"
+down_revision = "0002_access_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "blobs",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("file_path", sa.String(500), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("content_type", sa.String(100), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+
+    with op.batch_alter_table("attachments") as batch_op:
+        batch_op.add_column(sa.Column("blob_sha256", sa.String(64), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_attachments_blob_sha256_blobs", "blobs", ["blob_sha256"], ["sha256"]
+        )
+        batch_op.create_index("ix_attachments_blob_sha256", ["blob_sha256"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("attachments") as batch_op:
+        batch_op.drop_index("ix_attachments_blob_sha256")
+        batch_op.drop_constraint("fk_attachments_blob_sha256_blobs", type_="foreignkey")
+        batch_op.drop_column("blob_sha256")
+
+    op.drop_table("blobs")
@@ -0,0 +1,35 @@
+"""Queue for background deletion of stored files
+
+Adds pending_deletions: files whose rows are gone and that the background
+reaper still has to remove from storage.
+
+Revision ID: 0004_pending_deletions
+Revises: 0003_content_addressed_blobs
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_pending_deletions"
+down_revision = "0003_content_addressed_blobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pending_deletions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("file_path", sa.String(500), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_pending_deletions_next_attempt_at", "pending_deletions", ["next_attempt_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pending_deletions_next_attempt_at", table_name="pending_deletions")
+    op.drop_table("pending_deletions")
@@ -0,0 +1,53 @@
+"""Task counters for the stats endpoint
+
+Adds task_counters (tasks per status / priority / assignee, plus the
+total) and fills it from the existing tasks. Afterwards the API keeps it
+up to date; scripts/rebuild_task_stats.py recomputes it if needed.
+
+Revision ID: 0006_task_counters
+Revises: 0005_task_full_text_search
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_task_counters"
+down_revision = "0005_task_full_text_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "task_counters",
+        sa.Column("dimension", sa.String(20), primary_key=True),
+        sa.Column("value", sa.String(50), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+
+    # Enum columns store member names (TODO); counters use values (todo)
+    op.execute(
+        "INSERT INTO task_counters (dimension, value, count) "
+        "SELECT 'total', 'all', COUNT(*) FROM tasks"
+    )
+    op.execute(
+        "INSERT INTO task_counters (dimension, value, count) "
+        "SELECT 'status', LOWER(CAST(status AS VARCHAR)), COUNT(*) FROM tasks "
+        "WHERE status IS NOT NULL GROUP BY status"
+    )
+    op.execute(
+        "INSERT INTO task_counters (dimension, value, count) "
+        "SELECT 'priority', LOWER(CAST(priority AS VARCHAR)), COUNT(*) FROM tasks "
+        "WHERE priority IS NOT NULL GROUP BY priority"
+    )
+    op.execute(
+        "INSERT INTO task_counters (dimension, value, count) "
+        "SELECT 'assignee', COALESCE(CAST(assignee_id AS VARCHAR), 'none'), COUNT(*) FROM tasks "
+        "GROUP BY assignee_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("task_counters")
@@ -0,0 +1,29 @@
+"""Indexes on stored file paths
+
+The orphan sweep looks up each batch of listed storage paths in attachments,
+blobs and pending_deletions (file_path IN (...)).
+
+Revision ID: 0007_file_path_indexes
+Revises: 0006_task_counters
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_file_path_indexes"
+down_revision = "0006_task_counters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_attachments_file_path", "attachments", ["file_path"])
+    op.create_index("ix_blobs_file_path", "blobs", ["file_path"])
+    op.create_index("ix_pending_deletions_file_path", "pending_deletions", ["file_path"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pending_deletions_file_path", table_name="pending_deletions")
+    op.drop_index("ix_blobs_file_path", table_name="blobs")
+    op.drop_index("ix_attachments_file_path", table_name="attachments")
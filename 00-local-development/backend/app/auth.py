@@ -1,32 +1,96 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 
-import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 
+from app.cache import TTLCache
 from app.config import settings
-from app.database import get_db
+from app.database import Database, get_db
+from app.hashing import HasherBusy, PasswordHasher
 from app.models import User
 from app.schemas import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(
-        plain_password.encode("utf-8"),
-        hashed_password.encode("utf-8")
-    )
+# =============================================================================
+# AUTHENTICATED USER CACHE
+# =============================================================================
+# get_current_user runs on every API call. User rows rarely change, so active
+# users are cached by token subject (username) for a short TTL, saving a
+# SELECT per request. Entries are dropped whenever a User row is updated or
+# deleted in this process; the TTL bounds staleness for changes made elsewhere.
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Read-only snapshot of the User columns endpoints use."""
+    id: int
+    email: str
+    username: str
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            is_active=user.is_active,
+            created_at=user.created_at,
+        )
+
+
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.username)
+    # A renamed user must also drop the entry under the old name
+    for old_username in inspect(target).attrs.username.history.deleted:
+        user_cache.invalidate(old_username)
+
+
+# bcrypt runs in its own process pool (see app/hashing.py)
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    pool_size=settings.BCRYPT_POOL_SIZE,
+    max_queue=settings.BCRYPT_MAX_QUEUE,
+)
+
+hasher_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many authentication requests, try again shortly",
+    headers={"Retry-After": "1"},
+)
 
 
-def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(
-        password.encode("utf-8"),
-        bcrypt.gensalt()
-    ).decode("utf-8")
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusy:
+        raise hasher_busy_exception
+
+
+async def get_password_hash(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy:
+        raise hasher_busy_exception
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    return password_hasher.needs_rehash(hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -40,10 +104,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_current_user(
+def _load_user(db: Session, username: str) -> Optional[CachedUser]:
+    user = db.query(User).filter(User.username == username).first()
+    return CachedUser.from_user(user) if user else None
+
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+    db: Database = Depends(get_db)
+) -> CachedUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -58,13 +127,20 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+    cached = user_cache.get(token_data.username)
+    if cached is not None:
+        return cached
+
+    snapshot = await db.run(_load_user, token_data.username)
+    if snapshot is None:
         raise credentials_exception
-    return user
+
+    if snapshot.is_active:
+        user_cache.set(snapshot.username, snapshot)
+    return snapshot
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: CachedUser = Depends(get_current_user)) -> CachedUser:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -0,0 +1,115 @@
+# =============================================================================
+# CONTENT-ADDRESSED BLOBS
+# =============================================================================
+# With CONTENT_ADDRESSED_STORAGE on, each unique file content is stored once,
+# under its SHA-256 digest. Attachments reference a Blob row whose ref_count
+# says how many attachments share it:
+#
+#   upload:  hash the (already spooled) upload; if the blob exists just bump
+#            ref_count and skip the storage write entirely
+#   delete:  decrement ref_count; only the last reference queues the bytes
+#            for deletion (app/deletions.py)
+#
+# Each write of a blob goes to a new storage key (digest plus a random
+# suffix), never a path that was used before: if the content comes back
+# after its last reference was deleted, the re-upload can't be hit by the
+# reaper deleting the old copy.
+#
+# These helpers don't commit - callers commit together with the Attachment
+# change so the count and the rows can't drift apart.
+
+import hashlib
+import uuid
+from typing import BinaryIO, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import Blob
+from app.storage import CHUNK_SIZE, FileTooLargeError, StorageBackend
+
+BLOB_FOLDER = "blobs"
+
+
+def content_digest(file: BinaryIO, max_size: Optional[int] = None) -> tuple[str, int]:
+    """
+    Return (sha256 hex digest, size) of a seekable file, then rewind it.
+
+    Raises FileTooLargeError as soon as max_size is exceeded.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := file.read(CHUNK_SIZE):
+        size += len(chunk)
+        if max_size and size > max_size:
+            raise FileTooLargeError(max_size)
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest(), size
+
+
+def blob_path(storage: StorageBackend, sha256: str) -> str:
+    """A new storage path for a blob, fanned out by the first two hex digits."""
+    return storage.path_for(f"{BLOB_FOLDER}/{sha256[:2]}", f"{sha256}-{uuid.uuid4().hex}")
+
+
+def acquire_blob(db: Session, sha256: str) -> Optional[Blob]:
+    """Add a reference to an existing blob. Returns None if there isn't one."""
+    updated = db.query(Blob).filter(Blob.sha256 == sha256).update(
+        {Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False
+    )
+    if not updated:
+        return None
+    return db.query(Blob).filter(Blob.sha256 == sha256).populate_existing().first()
+
+
+def register_blob(
+    db: Session,
+    sha256: str,
+    file_path: str,
+    file_size: int,
+    content_type: Optional[str]
+) -> Blob:
+    """
+    Record a newly written blob with one reference.
+
+    If a concurrent upload of the same content registered it first, add a
+    reference to that row instead; the returned blob's file_path is then not
+    file_path, and the caller queues file_path for deletion.
+    """
+    try:
+        with db.begin_nested():
+            blob = Blob(
+                sha256=sha256,
+                file_path=file_path,
+                file_size=file_size,
+                content_type=content_type,
+                ref_count=1
+            )
+            db.add(blob)
+        return blob
+    except IntegrityError:
+        return acquire_blob(db, sha256)
+
+
+def release_blob(db: Session, sha256: str, count: int = 1) -> Optional[str]:
+    """
+    Drop count references to a blob. Call after the referencing attachments
+    have been deleted and flushed (the blob row may be deleted here).
+
+    Returns the blob's file_path if that was the last reference (the caller
+    queues the bytes for deletion), otherwise None.
+    """
+    db.query(Blob).filter(Blob.sha256 == sha256).update(
+        {Blob.ref_count: Blob.ref_count - count}, synchronize_session=False
+    )
+    blob = db.query(Blob).filter(Blob.sha256 == sha256).populate_existing().first()
+    if blob is None or blob.ref_count > 0:
+        return None
+
+    # Conditional delete: a concurrent upload may have re-acquired it
+    deleted = db.query(Blob).filter(
+        Blob.sha256 == sha256,
+        Blob.ref_count <= 0
+    ).delete(synchronize_session=False)
+    return blob.file_path if deleted else None
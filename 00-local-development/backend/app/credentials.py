@@ -0,0 +1,228 @@
+# =============================================================================
+# DATABASE CREDENTIALS (Secrets Manager)
+# =============================================================================
+# With USE_SECRETS_MANAGER, the database URL comes from a secret that may be
+# rotated at any time. SecretsManagerCredentials keeps it current:
+#
+#   - cached for DB_SECRET_TTL_SECONDS, and refreshed in the background
+#     (every half TTL, started in the app lifespan), so connecting never
+#     waits on Secrets Manager in the normal case
+#   - attached to each engine with a do_connect hook: every new connection
+#     uses the current credentials, so the engine never needs rebuilding
+#   - when a connection attempt fails authentication (the secret rotated
+#     before our refresh), the secret is re-read at once and the connect
+#     retried, so requests keep working through a rotation
+#   - when a refresh sees the secret change, the engines' pools are swapped
+#     for fresh ones right away: checked-out connections finish their work,
+#     new checkouts connect with the new credentials
+#
+# The async engine connects on the event loop, where boto3 must not run:
+# there the hook uses the cached URL (a stale one is refreshed in a worker
+# thread, not waited for), and the re-read after an auth failure runs in a
+# worker thread while the connect awaits it.
+#
+# The secret is either {"url": ...} or the RDS rotation format (username,
+# password, host, port, dbname); fields present override the URL's, since
+# the rotation Lambda only updates "password".
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.util import await_only
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATEs for a rejected login (invalid_password, invalid_authorization_specification)
+AUTH_FAILURE_CODES = {"28P01", "28000"}
+
+
+def is_auth_error(error: BaseException) -> bool:
+    """Whether a connect error means the credentials were rejected."""
+    code = getattr(error, "pgcode", None) or getattr(error, "sqlstate", None)
+    if code in AUTH_FAILURE_CODES:
+        return True
+    return "password authentication failed" in str(error).lower()
+
+
+def secret_to_url(secret: dict) -> str:
+    if "url" in secret:
+        url = make_url(secret["url"])
+    else:
+        url = URL.create(
+            "postgresql",
+            host=secret.get("host"),
+            port=secret.get("port"),
+            database=secret.get("dbname"),
+        )
+    url = url.set(
+        username=secret.get("username", url.username),
+        password=secret.get("password", url.password),
+    )
+    return url.render_as_string(hide_password=False)
+
+
+class SecretsManagerCredentials:
+    """The database URL from a Secrets Manager secret, cached and kept current."""
+
+    def __init__(self, secret_id: str, ttl: float = 300, client=None, region_name: Optional[str] = None):
+        self.secret_id = secret_id
+        self.ttl = ttl
+        self.region_name = region_name
+        self._client = client
+        self._url: Optional[str] = None
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._on_rotate: list[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self):
+        # boto3 is only imported when Secrets Manager is actually used
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("secretsmanager", region_name=self.region_name)
+        return self._client
+
+    def _fetch(self) -> str:
+        response = self.client.get_secret_value(SecretId=self.secret_id)
+        return secret_to_url(json.loads(response["SecretString"]))
+
+    def get_url(self) -> str:
+        """The cached URL, re-read if older than the TTL (kept if the re-read fails)."""
+        if self._url is not None and time.monotonic() - self._fetched_at < self.ttl:
+            return self._url
+        try:
+            self.refresh()
+        except Exception:
+            if self._url is None:
+                raise
+            logger.warning("Could not refresh database credentials; using cached ones", exc_info=True)
+        return self._url
+
+    def cached_url(self) -> str:
+        """
+        The cached URL without waiting on Secrets Manager (for the event
+        loop). Past the TTL, a refresh is started in a worker thread.
+        """
+        if self._url is None:
+            # Only before the first fetch; init_engines fetches at startup
+            return self.get_url()
+        if time.monotonic() - self._fetched_at >= self.ttl:
+            self._refresh_soon()
+        return self._url
+
+    def refresh(self) -> bool:
+        """
+        Re-read the secret now. Returns True if the credentials changed, in
+        which case the on_rotate callbacks have already run.
+        """
+        url = self._fetch()
+        with self._lock:
+            changed = self._url is not None and url != self._url
+            self._url, self._fetched_at = url, time.monotonic()
+        if changed:
+            logger.info("Database credentials rotated")
+            for callback in self._on_rotate:
+                callback()
+        return changed
+
+    def on_rotate(self, callback: Callable[[], None]) -> None:
+        """Call callback (from whichever thread refreshed) when the credentials change."""
+        self._on_rotate.append(callback)
+
+    def _refresh_soon(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        asyncio.get_running_loop().run_in_executor(None, self._refresh_quietly)
+
+    def _refresh_quietly(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.warning("Could not refresh database credentials; using cached ones", exc_info=True)
+        finally:
+            self._refreshing = False
+
+    # -------------------------------------------------------------------------
+    # Engine hook
+    # -------------------------------------------------------------------------
+
+    def attach(self, engine: Engine, on_event_loop: bool = False) -> None:
+        """
+        Make engine's new connections use the current credentials.
+
+        engine is a sync engine, or AsyncEngine.sync_engine with
+        on_event_loop=True (its connects run on the event loop, so they
+        never call Secrets Manager directly).
+        """
+
+        def use_current(dialect, cargs: list, cparams: dict) -> str:
+            """Put the current credentials into the connect args; returns the URL used."""
+            url = self.cached_url() if on_event_loop else self.get_url()
+            current_cargs, current_cparams = dialect.create_connect_args(make_url(url))
+            cargs[:] = current_cargs
+            cparams.update(current_cparams)
+            return url
+
+        def refresh() -> None:
+            if on_event_loop:
+                # Inside the async engine's greenlet: await the re-read in a thread
+                await_only(asyncio.to_thread(self.refresh))
+            else:
+                self.refresh()
+
+        @event.listens_for(engine, "do_connect")
+        def connect(dialect, connection_record, cargs, cparams):
+            used = use_current(dialect, cargs, cparams)
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except Exception as error:
+                if not is_auth_error(error):
+                    raise
+                # Rotated since our last refresh: re-read the secret and retry
+                # once if the credentials now differ from the ones we tried.
+                # Compare with those, not with what refresh() saw: another
+                # thread may already have stored the new secret.
+                try:
+                    refresh()
+                except Exception:
+                    logger.warning("Could not re-read database credentials", exc_info=True)
+                if self._url == used:
+                    raise
+                use_current(dialect, cargs, cparams)
+                return dialect.connect(*cargs, **cparams)
+
+    # -------------------------------------------------------------------------
+    # Background refresh
+    # -------------------------------------------------------------------------
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl / 2)
+            try:
+                await run_in_threadpool(self.refresh)
+            except Exception:
+                logger.warning("Could not refresh database credentials", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
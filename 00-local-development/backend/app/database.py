@@ -1,53 +1,596 @@
-import json
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Union
 
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError, jwt
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.cache import TTLCache
 from app.config import settings
+from app.credentials import SecretsManagerCredentials
+from app.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+
+# Production database credentials, kept current through rotations (app/credentials.py)
+credentials: Optional[SecretsManagerCredentials] = None
+if settings.USE_SECRETS_MANAGER and settings.DB_SECRET_NAME:
+    credentials = SecretsManagerCredentials(
+        settings.DB_SECRET_NAME,
+        ttl=settings.DB_SECRET_TTL_SECONDS,
+        region_name=settings.AWS_REGION,
+    )
 
 
 def get_database_url() -> str:
     """
     Get database URL, optionally fetching credentials from Secrets Manager.
     """
-    # If using Secrets Manager (production), fetch credentials
-    if settings.USE_SECRETS_MANAGER and settings.DB_SECRET_NAME:
-        import boto3
-        client = boto3.client("secretsmanager", region_name=settings.AWS_REGION)
-        response = client.get_secret_value(SecretId=settings.DB_SECRET_NAME)
-        secret = json.loads(response["SecretString"])
-        return secret["url"]  # Pre-built connection URL from Secrets Manager
+    # If using Secrets Manager (production), use the cached credentials
+    if credentials is not None:
+        return credentials.get_url()
 
     # Otherwise use DATABASE_URL from environment
     return settings.DATABASE_URL
 
 
-def create_db_engine():
+def create_db_engine(db_url: Optional[str] = None, read_only: bool = False):
     """
     Create SQLAlchemy engine with appropriate settings for SQLite or PostgreSQL.
+    read_only engines only serve reads (replicas, the tuned SQLite reader pool).
     """
-    db_url = get_database_url()
+    db_url = db_url or get_database_url()
 
     # SQLite requires check_same_thread=False
     if db_url.startswith("sqlite"):
-        return create_engine(db_url, connect_args={"check_same_thread": False})
+        if not sqlite_tuned(db_url):
+            return create_engine(db_url, connect_args={"check_same_thread": False}, **pool_class(db_url))
+        sqlite_engine = create_engine(
+            db_url,
+            connect_args={"check_same_thread": False},
+            poolclass=MeteredQueuePool,
+            **sqlite_pool_options(read_only)
+        )
+        tune_sqlite(sqlite_engine, read_only)
+        return sqlite_engine
 
     # PostgreSQL with connection pooling
     return create_engine(
         db_url,
-        pool_size=5,
-        max_overflow=10,
+        poolclass=MeteredQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
         pool_pre_ping=True,  # Verify connections before use
     )
 
 
-engine = create_db_engine()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# =============================================================================
+# TUNED SQLITE
+# =============================================================================
+# SQLITE_TUNED=true sets a file database up for concurrent use (edge and
+# small deployments), instead of writers failing with "database is locked":
+#
+#   - WAL journal, so readers and the writer don't block each other
+#   - PRAGMAs on every connection: synchronous (NORMAL is safe with WAL; a
+#     power cut can lose the last commits, never corrupt), busy_timeout,
+#     cache_size and mmap_size
+#   - one writer connection per process: requests that write queue for it
+#     in the pool, and its transactions start with BEGIN IMMEDIATE, so a
+#     transaction that reads then writes waits for the lock up front rather
+#     than failing to upgrade it
+#   - a pool of query_only reader connections, used by GET requests
+#
+# Writers in other processes (uvicorn workers, scripts) wait up to
+# SQLITE_BUSY_TIMEOUT_MS. Endpoints end their transaction (db.release())
+# before long awaits, so they don't keep the writer while bcrypt or an
+# upload runs. python -m scripts.bench_sqlite_concurrency compares this
+# with the default setup.
+
+def sqlite_file(db_url) -> bool:
+    return make_url(db_url).database not in (None, "", ":memory:")
+
+
+def sqlite_tuned(db_url) -> bool:
+    # An in-memory database belongs to a single connection: nothing to tune
+    return settings.SQLITE_TUNED and sqlite_file(db_url)
+
+
+def sqlite_pool_options(read_only: bool) -> dict:
+    if read_only:
+        return {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+    return {"pool_size": 1, "max_overflow": 0}
+
+
+def tune_sqlite(sqlite_engine: Engine, read_only: bool) -> None:
+    """Apply the SQLITE_TUNED settings to each connection (sync engine or AsyncEngine.sync_engine)."""
+
+    @event.listens_for(sqlite_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_MB * 1024}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+        if not read_only:
+            # Leave BEGIN to the event below (the driver would issue a deferred one)
+            dbapi_connection.isolation_level = None
+
+    if not read_only:
+        @event.listens_for(sqlite_engine, "begin")
+        def begin_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+# =============================================================================
+# ASYNC ENGINE MODE
+# =============================================================================
+# With DB_ASYNC=true, requests talk to the database through an AsyncEngine
+# (asyncpg for PostgreSQL, aiosqlite for SQLite): a request waiting on a query
+# holds no thread, so one worker can keep hundreds of queries in flight
+# (size DB_POOL_SIZE / DB_MAX_OVERFLOW to match). Otherwise requests use the
+# sync engine through the threadpool, as before.
+#
+# Either way, endpoints get a Database from get_db and run plain sync Session
+# code with `await db.run(fn, ...)`; in async mode that's AsyncSession.run_sync,
+# which runs fn on the event loop and awaits the driver at each query. So the
+# query code is the same in both modes, and shared with the background reaper
+# and scripts (which always use the sync engine and SessionLocal).
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url(db_url: str) -> URL:
+    """The same database URL, for its async driver."""
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"DB_ASYNC is not supported for {backend} databases")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    # asyncpg takes ssl= instead of libpq's sslmode=
+    if "sslmode" in url.query:
+        url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(["sslmode"])
+    return url
+
+
+def create_async_db_engine(db_url: Optional[str] = None, read_only: bool = False) -> AsyncEngine:
+    url = async_database_url(db_url or get_database_url())
+    if url.get_backend_name() == "sqlite":
+        if not sqlite_tuned(url):
+            return create_async_engine(url, **pool_class(url, is_async=True))
+        sqlite_engine = create_async_engine(
+            url, poolclass=MeteredAsyncQueuePool, **sqlite_pool_options(read_only)
+        )
+        tune_sqlite(sqlite_engine.sync_engine, read_only)
+        return sqlite_engine
+    return create_async_engine(
+        url,
+        poolclass=MeteredAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+
+
+# =============================================================================
+# ENGINES
+# =============================================================================
+# Engines are created by init_engines(), from the app's lifespan, not at
+# import: building the URL can mean a Secrets Manager call, and a container
+# shouldn't make network calls while it is still importing modules. The
+# session factories exist from the start and are bound there. Scripts call
+# init_engines() themselves.
+
 Base = declarative_base()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+engine: Optional[Engine] = None
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal = async_sessionmaker(autoflush=False)
+
+# Tuned SQLite: read-only requests use their own pool of reader connections
+read_engine: Optional[Union[Engine, AsyncEngine]] = None
+ReadSessionLocal: Optional[Union[sessionmaker, async_sessionmaker]] = None
+
+
+def init_engines() -> Engine:
+    """Create the engines and bind the session factories (idempotent). Returns the sync engine."""
+    global engine, async_engine, read_engine, ReadSessionLocal
+    if engine is not None:
+        return engine
+
+    database_url = get_database_url()
+    engine = create_db_engine(database_url)
+    SessionLocal.configure(bind=engine)
+
+    if settings.DB_ASYNC:
+        async_engine = create_async_db_engine(database_url)
+        AsyncSessionLocal.configure(bind=async_engine)
+
+    if sqlite_tuned(database_url):
+        if settings.DB_ASYNC:
+            read_engine = create_async_db_engine(database_url, read_only=True)
+            ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False)
+        else:
+            read_engine = create_db_engine(database_url, read_only=True)
+            ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+    if credentials is not None:
+        credentials.attach(engine)
+        if async_engine is not None:
+            credentials.attach(async_engine.sync_engine, on_event_loop=True)
+        credentials.on_rotate(_replace_pools)
+
+    replica_set.connect(settings.replica_urls)
+    return engine
+
+
+def _replace_pools() -> None:
+    """Fresh pools after a credential rotation; checked-out connections finish on the old ones."""
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+
+def new_session(replica: Optional["Replica"] = None, read_only: bool = False) -> Union[Session, AsyncSession]:
+    """A session on the given replica, or the primary, in the configured mode."""
+    if replica is not None:
+        return replica.session_factory()
+    if read_only and ReadSessionLocal is not None:
+        return ReadSessionLocal()
+    return AsyncSessionLocal() if settings.DB_ASYNC else SessionLocal()
+
+
+# =============================================================================
+# READ REPLICAS
+# =============================================================================
+# With DATABASE_REPLICA_URLS set, GET/HEAD requests read from a replica
+# (round-robin) and everything else goes to the primary, except:
+#
+#   - read-your-writes: for REPLICA_READ_YOUR_WRITES_SECONDS after a
+#     client's POST/PATCH/PUT/DELETE, its reads go to the primary too, so a
+#     lagging replica can't hide its own change. Write responses carry the
+#     time of the write in a cookie (ReadYourWritesMiddleware), which works
+#     whichever process or task serves the next read. For clients that drop
+#     cookies, each process also remembers the users (JWT subject) it saw
+#     write; that fallback only holds with one task or sticky sessions.
+#   - failover: a replica that can't be reached is skipped for
+#     REPLICA_RETRY_SECONDS and the failed read is redone on the primary;
+#     with no healthy replica, reads use the primary
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Unix time of the client's last successful write
+LAST_WRITE_COOKIE = "last_write"
+
+
+class Replica:
+    """One read replica: its engine and health."""
+
+    def __init__(self, db_url: str):
+        self.name = make_url(db_url).render_as_string(hide_password=True)
+        if settings.DB_ASYNC:
+            self.engine = create_async_db_engine(db_url, read_only=True)
+            self.session_factory = async_sessionmaker(self.engine, autoflush=False)
+        else:
+            self.engine = create_db_engine(db_url, read_only=True)
+            self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.failures = 0
+        self.down_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self) -> None:
+        self.failures += 1
+        self.down_until = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+    async def dispose(self) -> None:
+        if isinstance(self.engine, AsyncEngine):
+            await self.engine.dispose()
+        else:
+            self.engine.dispose()
+
+
+class ReplicaSet:
+    def __init__(self):
+        self.replicas: list[Replica] = []
+        self._turn = itertools.count()
+
+    def connect(self, db_urls: list[str]) -> None:
+        """Create the replicas' engines (from init_engines)."""
+        if not self.replicas:
+            self.replicas = [Replica(db_url) for db_url in db_urls]
+
+    def choose(self) -> Optional[Replica]:
+        """The next healthy replica, or None to use the primary."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def stats(self) -> list[dict]:
+        return [
+            {"url": replica.name, "healthy": replica.healthy, "failures": replica.failures}
+            for replica in self.replicas
+        ]
+
+
+replica_set = ReplicaSet()
+
+# Users who wrote recently through this process, so their reads stay on the
+# primary (fallback for clients without the cookie)
+recent_writers = TTLCache(maxsize=10000, ttl=settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+
 
+def request_user(request: Request) -> Optional[str]:
+    """The bearer token's subject, for routing only (get_current_user verifies the token)."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+
+def wrote_recently(request: Request, user: Optional[str]) -> bool:
+    """Whether the client wrote within REPLICA_READ_YOUR_WRITES_SECONDS."""
+    try:
+        age = time.time() - float(request.cookies[LAST_WRITE_COOKIE])
+    except (KeyError, ValueError):
+        age = None
+    # A timestamp from the future is bogus, not a reason to pin the client
+    if age is not None and 0 <= age < settings.REPLICA_READ_YOUR_WRITES_SECONDS:
+        return True
+    return user is not None and bool(recent_writers.get(user))
+
+
+def choose_replica(request: Request, user: Optional[str]) -> Optional[Replica]:
+    if request.method not in SAFE_METHODS:
+        return None
+    if wrote_recently(request, user):
+        return None
+    return replica_set.choose()
+
+
+class Database:
+    """A request's session. Run sync Session code with `await db.run(fn, *args)`."""
+
+    def __init__(self, session: Union[Session, AsyncSession], replica: Optional[Replica] = None):
+        self.session = session
+        self.replica = replica
+
+    async def run(self, fn, *args, **kwargs):
+        """Call fn(session, *args, **kwargs) without blocking the event loop on I/O."""
+        try:
+            return await self._run(fn, *args, **kwargs)
+        except OperationalError:
+            if self.replica is None:
+                raise
+            # Replica unreachable: take it out of rotation for a while and redo
+            # this (read-only) call on the primary
+            logger.warning("Read replica %s failed; using the primary", self.replica.name, exc_info=True)
+            self.replica.mark_down()
+            self.replica = None
+            await self.close()
+            self.session = new_session(read_only=True)
+            return await self._run(fn, *args, **kwargs)
+
+    async def _run(self, fn, *args, **kwargs):
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self) -> None:
+        if isinstance(self.session, AsyncSession):
+            await self.session.close()
+        else:
+            await run_in_threadpool(self.session.close)
+
+    async def release(self) -> None:
+        """
+        End the transaction and hand the connection back before a long await
+        (bcrypt, an upload). Loaded objects stay readable but are detached:
+        db.add() one to change it later. The session can be used again.
+        """
+        await self.close()
+
+
+async def get_db(request: Request):
+    user = request_user(request)
+    writes = request.method not in SAFE_METHODS
+    if writes and user is not None:
+        recent_writers.set(user, True)
 
-def get_db():
-    db = SessionLocal()
+    replica = choose_replica(request, user)
+    db = Database(new_session(replica, read_only=not writes), replica)
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+        # The window starts again once the write is done
+        if writes and user is not None:
+            recent_writers.set(user, True)
+
+
+async def dispose_engines() -> None:
+    """Close pooled connections (app shutdown)."""
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
+    if isinstance(read_engine, AsyncEngine):
+        await read_engine.dispose()
+    elif read_engine is not None:
+        read_engine.dispose()
+    for replica in replica_set.replicas:
+        await replica.dispose()
+
+
+# =============================================================================
+# QUERY COUNTER
+# =============================================================================
+# Counts SQL statements executed while a counter is active. main.py opens one
+# per request and reports it in the X-Query-Count header, so N+1 regressions
+# show up as a number a test can assert on.
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+_query_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+@contextmanager
+def count_queries():
+    """Count the queries executed in this context (including threadpool work it spawns)."""
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+# =============================================================================
+# DATABASE METRICS
+# =============================================================================
+# For GET /metrics (app/metrics.py): every statement's duration (from the
+# same cursor events as the query counter), statements that failed, how long
+# each connection checkout waited on the pool, and each pool's usage, read
+# when scraped. Covers every engine, sync and async, including scripts'.
+
+db_query_seconds = Histogram(
+    "taskflow_db_query_duration_seconds",
+    "SQL statement execution time, by statement type",
+    ("operation",),
+)
+db_query_errors = Counter(
+    "taskflow_db_query_errors_total",
+    "SQL statements that raised, by statement type",
+    ("operation",),
+)
+db_pool_wait_seconds = Histogram(
+    "taskflow_db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool (queueing, plus connecting when the pool opens a new one)",
+)
+
+QUERY_OPERATIONS = frozenset({"select", "insert", "update", "delete"})
+
+
+def query_operation(statement: str) -> str:
+    keyword = statement.lstrip()[:6].lower()
+    return keyword if keyword in QUERY_OPERATIONS else "other"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _observe_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is not None:
+        db_query_seconds.observe(time.perf_counter() - started, query_operation(statement))
+
+
+@event.listens_for(Engine, "handle_error")
+def _count_query_error(context):
+    if context.connection is not None:
+        context.connection.info.pop("query_started", None)
+    if context.statement is not None:
+        db_query_errors.inc(query_operation(context.statement))
+
+
+class MeteredCheckout:
+    """Pool mixin: time each checkout (the pool has no event before one)."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_pool_wait_seconds.observe(time.perf_counter() - started)
+
+
+class MeteredQueuePool(MeteredCheckout, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(MeteredCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_class(db_url, is_async: bool = False) -> dict:
+    """poolclass= for an engine: the metered pool, except for in-memory SQLite (one shared connection)."""
+    if not sqlite_file(db_url):
+        return {}
+    return {"poolclass": MeteredAsyncQueuePool if is_async else MeteredQueuePool}
+
+
+def _engines() -> Iterator[tuple[str, Engine]]:
+    if engine is not None:
+        yield "primary", engine
+    if async_engine is not None:
+        yield "primary_async", async_engine.sync_engine
+    if read_engine is not None:
+        yield "reader", getattr(read_engine, "sync_engine", read_engine)
+    for replica in replica_set.replicas:
+        yield replica.name, getattr(replica.engine, "sync_engine", replica.engine)
+
+
+def _pool_usage() -> dict:
+    usage = {}
+    for name, pooled_engine in _engines():
+        pool = pooled_engine.pool
+        if isinstance(pool, QueuePool):
+            usage[(name, "checked_out")] = pool.checkedout()
+            usage[(name, "idle")] = pool.checkedin()
+    return usage
+
+
+def _pool_size() -> dict:
+    return {
+        (name,): pooled_engine.pool.size()
+        for name, pooled_engine in _engines()
+        if isinstance(pooled_engine.pool, QueuePool)
+    }
+
+
+Gauge(
+    "taskflow_db_pool_connections",
+    "Open connections per engine: checked out by a request or idle in the pool",
+    ("engine", "state"),
+    _pool_usage,
+)
+Gauge(
+    "taskflow_db_pool_size",
+    "Configured pool size per engine (it may open up to DB_MAX_OVERFLOW more)",
+    ("engine",),
+    _pool_size,
+)
@@ -0,0 +1,189 @@
+# =============================================================================
+# DELETION QUEUE
+# =============================================================================
+# Requests never delete stored files themselves. They queue the paths in
+# pending_deletions, in the same transaction that removes the rows using
+# them, and a background worker (started in the main.py lifespan) drains it:
+#
+#   - in batches: S3 DeleteObjects takes up to 1000 keys per call, local
+#     storage unlinks in parallel
+#   - paths that fail are retried with exponential backoff
+#   - every ORPHAN_SWEEP_INTERVAL_SECONDS it lists the app's folders in
+#     storage (tasks/, blobs/) and queues files nothing refers to (abandoned
+#     direct uploads, crashes mid-request)
+#
+# The queue is a table, not memory, so nothing is lost on restart and a
+# storage outage only delays deletion.
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+import anyio
+from sqlalchemy.orm import Session
+
+from app.blobs import BLOB_FOLDER
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Attachment, Blob, PendingDeletion
+from app.storage import StorageBackend, get_storage, invalidate_download_url
+
+logger = logging.getLogger(__name__)
+
+# Claimed rows are pushed this far into the future while being processed,
+# so another worker process doesn't pick up the same batch
+CLAIM_LEASE = timedelta(minutes=5)
+
+# Storage folders the app writes to; the orphan sweep never looks elsewhere
+SWEEP_FOLDERS = ("tasks", BLOB_FOLDER)
+
+
+def enqueue_deletions(db: Session, file_paths: Iterable[str]) -> None:
+    """Queue stored files for deletion. Doesn't commit - commit with the row deletes."""
+    for file_path in file_paths:
+        db.add(PendingDeletion(file_path=file_path))
+        invalidate_download_url(file_path)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    seconds = settings.DELETION_RETRY_BASE_SECONDS * 2 ** min(attempts - 1, 20)
+    return timedelta(seconds=min(seconds, settings.DELETION_RETRY_MAX_SECONDS))
+
+
+def process_due_deletions(storage: StorageBackend, now: Optional[datetime] = None) -> int:
+    """Delete one batch of due files. Returns the number of queue rows handled."""
+    now = now or datetime.utcnow()
+    db = SessionLocal()
+    try:
+        # Claim a batch. On PostgreSQL, FOR UPDATE SKIP LOCKED keeps workers
+        # from claiming the same rows; SQLite ignores it, and at worst two
+        # workers delete the same files (harmless: paths are never reused).
+        rows = (
+            db.query(PendingDeletion.id, PendingDeletion.file_path, PendingDeletion.attempts)
+            .filter(PendingDeletion.next_attempt_at <= now)
+            .order_by(PendingDeletion.next_attempt_at)
+            .limit(settings.DELETION_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            return 0
+        db.query(PendingDeletion).filter(PendingDeletion.id.in_([row.id for row in rows])).update(
+            {PendingDeletion.next_attempt_at: now + CLAIM_LEASE}, synchronize_session=False
+        )
+        db.commit()
+
+        failed = set(storage.delete_files(list({row.file_path for row in rows})))
+
+        # By id, so rows another worker already removed are simply skipped
+        done = [row.id for row in rows if row.file_path not in failed]
+        db.query(PendingDeletion).filter(PendingDeletion.id.in_(done)).delete(synchronize_session=False)
+        for row in rows:
+            if row.file_path in failed:
+                db.query(PendingDeletion).filter(PendingDeletion.id == row.id).update({
+                    PendingDeletion.attempts: row.attempts + 1,
+                    PendingDeletion.next_attempt_at: now + retry_delay(row.attempts + 1),
+                }, synchronize_session=False)
+        db.commit()
+
+        if failed:
+            logger.warning("Could not delete %d stored file(s); will retry", len(failed))
+        return len(rows)
+    finally:
+        db.close()
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _known_paths(db: Session, paths: list[str]) -> set[str]:
+    """The subset of paths an attachment, blob or queue row refers to."""
+    known = set()
+    for column in (Attachment.file_path, Blob.file_path, PendingDeletion.file_path):
+        known.update(path for (path,) in db.query(column).filter(column.in_(paths)))
+    return known
+
+
+def sweep_orphans(storage: StorageBackend, now: Optional[datetime] = None) -> int:
+    """Queue stored files that no attachment, blob or queue row refers to. Returns how many."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.ORPHAN_SWEEP_GRACE_SECONDS)
+    db = SessionLocal()
+    try:
+        # A fresh or restored-from-scratch database refers to nothing, which
+        # would make every stored file look orphaned: skip rather than empty
+        # the bucket
+        if db.query(Attachment.id).first() is None and db.query(Blob.sha256).first() is None:
+            logger.warning("No attachments or blobs in the database; skipping the orphan sweep")
+            return 0
+
+        # Only the app's own prefixes, compared a batch at a time, so neither
+        # the listing nor the lookup grows with everything in the bucket
+        total = 0
+        for folder in SWEEP_FOLDERS:
+            listed = (
+                file_path for file_path, modified in storage.list_files(folder)
+                if modified < cutoff
+            )
+            for batch in _batches(listed, settings.DELETION_BATCH_SIZE):
+                known = _known_paths(db, batch)
+                orphans = [file_path for file_path in batch if file_path not in known]
+                enqueue_deletions(db, orphans)
+                db.commit()
+                total += len(orphans)
+        if total:
+            logger.info("Queued %d orphaned file(s) for deletion", total)
+        return total
+    finally:
+        db.close()
+
+
+# =============================================================================
+# BACKGROUND WORKER
+# =============================================================================
+
+_reaper_task: Optional[asyncio.Task] = None
+
+
+async def _reaper_loop() -> None:
+    last_sweep = time.monotonic()
+    while True:
+        processed = 0
+        try:
+            storage = get_storage()
+            processed = await anyio.to_thread.run_sync(process_due_deletions, storage)
+            sweep_interval = settings.ORPHAN_SWEEP_INTERVAL_SECONDS
+            if sweep_interval and time.monotonic() - last_sweep >= sweep_interval:
+                last_sweep = time.monotonic()
+                await anyio.to_thread.run_sync(sweep_orphans, storage)
+        except Exception:
+            logger.exception("Deletion reaper iteration failed")
+
+        # A full batch means there's probably more waiting
+        if processed < settings.DELETION_BATCH_SIZE:
+            await asyncio.sleep(settings.DELETION_INTERVAL_SECONDS)
+
+
+def start_reaper() -> None:
+    """Start the background deletion worker (idempotent)."""
+    global _reaper_task
+    if _reaper_task is None or _reaper_task.done():
+        _reaper_task = asyncio.get_running_loop().create_task(_reaper_loop())
+
+
+async def stop_reaper() -> None:
+    """Stop the worker. Queued deletions stay in the table for next time."""
+    global _reaper_task
+    if _reaper_task is not None:
+        _reaper_task.cancel()
+        try:
+            await _reaper_task
+        except asyncio.CancelledError:
+            pass
+        _reaper_task = None
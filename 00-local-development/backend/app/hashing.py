@@ -0,0 +1,132 @@
+# =============================================================================
+# PASSWORD HASHING POOL
+# =============================================================================
+# bcrypt is deliberately slow (~250ms at cost 12). Run in-line in sync
+# endpoints it occupies Starlette's shared threadpool, so a burst of logins
+# starves every other endpoint. Here it runs in a dedicated process pool with
+# its own size and queue limit, and callers await the result.
+#
+# This module only imports bcrypt (and the standard-library app.metrics) so
+# pool workers (started with "spawn") stay small and quick to boot.
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import bcrypt
+
+from app.metrics import Histogram
+
+bcrypt_seconds = Histogram(
+    "taskflow_bcrypt_duration_seconds",
+    "Password hash/verify time as seen by the request, including the wait for a worker",
+    ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+class HasherBusy(Exception):
+    """Raised when too many hash operations are already queued, or the pool keeps failing."""
+
+
+def _hashpw(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(
+        password.encode("utf-8"),
+        bcrypt.gensalt(rounds=rounds)
+    ).decode("utf-8")
+
+
+def _checkpw(plain_password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(
+        plain_password.encode("utf-8"),
+        hashed_password.encode("utf-8")
+    )
+
+
+def hash_cost(hashed_password: str) -> int:
+    """Read the cost factor from a "$2b$12$..." bcrypt hash."""
+    return int(hashed_password.split("$")[2])
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop with bounded concurrency.
+
+    pool_size workers hash in parallel; at most max_queue operations may be
+    in flight (running + waiting) before HasherBusy is raised. pool_size=0
+    runs bcrypt in the default thread executor instead of a process pool.
+    """
+
+    def __init__(self, rounds: int = 12, pool_size: int = 2, max_queue: int = 64):
+        self.rounds = rounds
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        executor = self._get_executor()
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, *args))
+        except BrokenProcessPool:
+            # Concurrent callers may all see the same broken pool; only the
+            # first replaces it
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def _run(self, operation: str, fn, *args):
+        if self.in_flight >= self.max_queue:
+            raise HasherBusy()
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            if self.pool_size <= 0:
+                return await asyncio.to_thread(fn, *args)
+            try:
+                return await self._submit(fn, *args)
+            except BrokenProcessPool:
+                # A worker died (OOM kill, crash) and took the pool with it:
+                # start a fresh one and try once more
+                try:
+                    return await self._submit(fn, *args)
+                except BrokenProcessPool:
+                    raise HasherBusy()
+        finally:
+            self.in_flight -= 1
+            bcrypt_seconds.observe(time.perf_counter() - started, operation)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hashpw, password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", _checkpw, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True if the hash was made with a different cost than configured."""
+        return hash_cost(hashed_password) != self.rounds
+
+    def stats(self) -> dict:
+        workers = max(self.pool_size, 1)
+        return {
+            "pool_size": self.pool_size,
+            "in_flight": self.in_flight,
+            "queue_depth": max(self.in_flight - workers, 0),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
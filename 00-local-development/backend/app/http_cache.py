@@ -0,0 +1,79 @@
+# =============================================================================
+# CONDITIONAL REQUESTS
+# =============================================================================
+# ETag / Last-Modified validators and the If-None-Match / If-Modified-Since
+# checks (RFC 9110), shared by the file downloads and the task endpoints.
+# A client that already has the current version gets an empty 304 instead
+# of the full body.
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Union
+
+from fastapi import Request, status
+from starlette.responses import Response
+
+# Browsers may keep API responses, but must revalidate them on every use
+REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag from the values that identify a representation's version."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def http_date(value: Union[datetime, float]) -> str:
+    """Format a naive-UTC datetime or a timestamp as an HTTP date."""
+    if isinstance(value, datetime):
+        value = value.replace(tzinfo=timezone.utc).timestamp()
+    return formatdate(value, usegmt=True)
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, per RFC 9110)."""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified_since(header: str, last_modified: Union[datetime, float]) -> bool:
+    if isinstance(last_modified, datetime):
+        last_modified = last_modified.replace(tzinfo=timezone.utc).timestamp()
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have whole-second precision
+    return int(last_modified) <= since
+
+
+def is_not_modified(
+    request: Request,
+    etag: str,
+    last_modified: Optional[Union[datetime, float]] = None
+) -> bool:
+    """
+    True if the client's copy is current. If-None-Match wins when present;
+    If-Modified-Since is only used without it (and with a last_modified).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        return not_modified_since(if_modified_since, last_modified)
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[Union[datetime, float]] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
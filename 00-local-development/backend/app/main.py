@@ -1,17 +1,51 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.auth import password_hasher, user_cache
 from app.config import settings
-from app.database import engine, Base
-from app.routers import auth, tasks, users, attachments
+from app.database import credentials, dispose_engines, init_engines, replica_set
+from app.deletions import start_reaper, stop_reaper
+from app.metrics import CONTENT_TYPE, registry
+from app.middleware import MetricsMiddleware, QueryCountMiddleware, ReadYourWritesMiddleware
+from app.pagination import NEXT_CURSOR_HEADER
+from app.routers import auth, tasks, users, attachments, files
+from app.storage import close_storage, init_storage
+
+# Nothing here touches the database, S3 or Secrets Manager at import time:
+# connections are set up in the lifespan, and the schema is created by
+# migrations (alembic upgrade head), run as a separate step before the app.
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Database engines (in production, after fetching the Secrets Manager
+    # credentials) and the one storage backend (S3 client/connection pool)
+    # for the process, set up side by side
+    await asyncio.gather(run_in_threadpool(init_engines), run_in_threadpool(init_storage))
+    # Background worker that deletes queued attachment files
+    start_reaper()
+    # Keep Secrets Manager database credentials fresh
+    if credentials is not None:
+        credentials.start()
+    yield
+    if credentials is not None:
+        await credentials.stop()
+    await stop_reaper()
+    close_storage()
+    await dispose_engines()
+    # Stop the bcrypt worker processes
+    password_hasher.shutdown()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title=settings.APP_NAME,
     description="A collaborative task management API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for React frontend
@@ -21,13 +55,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
+# Report how many SQL statements each request ran (catches N+1 regressions)
+app.add_middleware(QueryCountMiddleware)
+
+# Keep a client's reads off the replicas right after it writes
+if settings.replica_urls:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Per-route latency and status for GET /metrics (added last: it times everything)
+app.add_middleware(MetricsMiddleware)
+
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(tasks.router)
 app.include_router(users.router)
 app.include_router(attachments.router)
+app.include_router(files.router)
 
 
 @app.get("/")
@@ -37,4 +84,15 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "read_replicas": replica_set.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (app/metrics.py). Keep it off the public internet."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,102 @@
+# =============================================================================
+# MIDDLEWARE
+# =============================================================================
+# Plain ASGI middleware (rather than @app.middleware / BaseHTTPMiddleware):
+# it adds no extra task or body buffering per request, and passes through
+# ASGI extensions such as zero-copy sendfile untouched.
+
+import math
+import time
+
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+from app.database import LAST_WRITE_COOKIE, SAFE_METHODS, count_queries
+from app.metrics import Histogram
+
+http_request_seconds = Histogram(
+    "taskflow_http_request_duration_seconds",
+    "Time to serve an HTTP request, by route template and response status",
+    ("method", "route", "status"),
+)
+
+
+class QueryCountMiddleware:
+    """Report how many SQL statements each request ran in X-Query-Count (catches N+1 regressions)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as counter:
+            async def send_with_count(message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Query-Count"] = str(counter.count)
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
+
+
+class MetricsMiddleware:
+    """Record each request's duration and status in http_request_seconds."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500  # if the app raises before responding
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The route template ("/tasks/{task_id}"), not the path, so the
+            # number of series stays bounded; set by the router once it matches
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_seconds.observe(time.perf_counter() - start, scope["method"], route, status_code)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Stamp successful write responses with the time of the write (the
+    last_write cookie), so the client's reads skip the replicas for
+    REPLICA_READ_YOUR_WRITES_SECONDS on any process (see app/database.py).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.max_age = math.ceil(settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_marker(message):
+            # Sent once the endpoint has committed, so the window starts
+            # after the write
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{LAST_WRITE_COOKIE}={time.time():.3f}; Max-Age={self.max_age}; "
+                    "Path=/; HttpOnly; SameSite=lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_marker)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -32,6 +32,12 @@ class User(Base):
     tasks_created = relationship("Task", back_populates="creator", foreign_keys="Task.creator_id")
     tasks_assigned = relationship("Task", back_populates="assignee", foreign_keys="Task.assignee_id")
 
+    # Indexes (keep in sync with alembic/versions)
+    __table_args__ = (
+        # GET /users: active users in keyset order
+        Index("ix_users_is_active_created_at_id", "is_active", "created_at", "id"),
+    )
+
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -54,6 +60,40 @@ class Task(Base):
     assignee = relationship("User", back_populates="tasks_assigned", foreign_keys=[assignee_id])
     attachments = relationship("Attachment", back_populates="task", cascade="all, delete-orphan")
 
+    # Indexes (keep in sync with alembic/versions)
+    # Each list index ends in (created_at, id) so filtered pages are read in
+    # keyset order straight from the index, with no sort step.
+    __table_args__ = (
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_tasks_assignee_id_created_at_id", "assignee_id", "created_at", "id"),
+        Index("ix_tasks_creator_id", "creator_id"),
+    )
+
+
+class Blob(Base):
+    """
+    A stored file, identified by the SHA-256 of its content.
+
+    With CONTENT_ADDRESSED_STORAGE on, identical uploads share one Blob;
+    ref_count tracks how many attachments point at it, and the bytes are
+    deleted only when it drops to zero (see app/blobs.py).
+    """
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    file_path = Column(String(500), nullable=False)  # Local path or S3 key
+    file_size = Column(Integer, nullable=False)
+    content_type = Column(String(100), nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Indexes (keep in sync with alembic/versions)
+    __table_args__ = (
+        # Orphan sweep: file_path IN (...)
+        Index("ix_blobs_file_path", "file_path"),
+    )
+
 
 class Attachment(Base):
     __tablename__ = "attachments"
@@ -65,8 +105,54 @@ class Attachment(Base):
     content_type = Column(String(100), nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
-    # Foreign Key
+    # Foreign Keys
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    # Set for deduplicated uploads; file_path then mirrors the blob's path
+    blob_sha256 = Column(String(64), ForeignKey("blobs.sha256"), nullable=True)
 
     # Relationship
     task = relationship("Task", back_populates="attachments")
+
+    # Indexes (keep in sync with alembic/versions)
+    __table_args__ = (
+        Index("ix_attachments_task_id", "task_id"),
+        Index("ix_attachments_blob_sha256", "blob_sha256"),
+        Index("ix_attachments_file_path", "file_path"),
+    )
+
+
+class PendingDeletion(Base):
+    """
+    A stored file waiting to be deleted by the background reaper.
+
+    Requests queue paths here in the same transaction that deletes the
+    rows using them (see app/deletions.py).
+    """
+    __tablename__ = "pending_deletions"
+
+    id = Column(Integer, primary_key=True)
+    file_path = Column(String(500), nullable=False)  # Local path or S3 key
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Indexes (keep in sync with alembic/versions)
+    __table_args__ = (
+        Index("ix_pending_deletions_next_attempt_at", "next_attempt_at"),
+        Index("ix_pending_deletions_file_path", "file_path"),
+    )
+
+
+class TaskCounter(Base):
+    """
+    Number of tasks per status, priority and assignee, for GET /tasks/stats.
+
+    Kept up to date by the task endpoints in the same transaction as the
+    task change (see app/stats.py); rows are e.g. ("status", "todo") or
+    ("assignee", "42").
+    """
+    __tablename__ = "task_counters"
+
+    dimension = Column(String(20), primary_key=True)
+    value = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
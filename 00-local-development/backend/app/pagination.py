@@ -0,0 +1,100 @@
+# =============================================================================
+# KEYSET PAGINATION
+# =============================================================================
+# Cursor-based paging on (created_at, id). Instead of OFFSET, which makes the
+# database scan and discard every skipped row, each page seeks directly to the
+# row after the last one the client saw, so deep pages cost the same as page 1.
+#
+# The cursor is opaque to clients: base64 of the last row's (created_at, id).
+# The next cursor is returned in the X-Next-Cursor response header so list
+# endpoints keep returning a plain JSON array.
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_position(values: list) -> str:
+    """Encode a list of JSON values as an opaque URL-safe cursor."""
+    raw = json.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_position(cursor: str) -> list:
+    """Decode a cursor produced by encode_position. Raises 400 if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        values = None
+    if not isinstance(values, list):
+        raise invalid_cursor_exception()
+    return values
+
+
+def invalid_cursor_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque URL-safe string."""
+    return encode_position([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor. Raises 400 if malformed."""
+    try:
+        created_at, row_id = decode_position(cursor)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise invalid_cursor_exception()
+
+
+def keyset_paginate(query, model, cursor: Optional[str], limit: int, descending: bool = True):
+    """
+    Order a query by (created_at, id) and, if a cursor is given, seek past it.
+
+    Fetches limit + 1 rows so set_next_cursor can tell whether another page
+    exists without a second COUNT query.
+    """
+    if descending:
+        order_by = (model.created_at.desc(), model.id.desc())
+    else:
+        order_by = (model.created_at.asc(), model.id.asc())
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < row_id)
+            ))
+        else:
+            query = query.filter(or_(
+                model.created_at > created_at,
+                and_(model.created_at == created_at, model.id > row_id)
+            ))
+
+    return query.order_by(*order_by).limit(limit + 1)
+
+
+def set_next_cursor(response: Response, rows: list, limit: int) -> list:
+    """
+    Trim the extra look-ahead row and expose the next cursor, if any.
+
+    Returns the rows for the current page.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return rows
@@ -3,69 +3,236 @@
 # =============================================================================
 # Handles file uploads and downloads for task attachments.
 # Supports both local storage and S3 based on configuration.
+#
+# Two ways to upload:
+#   1. POST multipart to this API (bytes flow through the FastAPI process)
+#   2. Direct upload: POST /initiate for a pre-signed URL, PUT the file
+#      straight to storage, then POST /complete to record the attachment
+#
+# Endpoints are async and use AsyncStorage, so a slow upload doesn't block
+# the event loop. Their (sync) database work runs through db.run
+# (app/database.py): in the threadpool, or on the async driver with DB_ASYNC.
+# Deleting only queues the file; app/deletions.py removes it in the background.
 
-from typing import List
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
+from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
-from app.auth import get_current_active_user
+from app.auth import CachedUser, get_current_active_user
+from app.blobs import acquire_blob, blob_path, content_digest, register_blob, release_blob
 from app.config import settings
-from app.database import get_db
-from app.models import Task, User, Attachment
-from app.schemas import AttachmentResponse
-from app.storage import get_storage
+from app.database import Database, get_db
+from app.deletions import enqueue_deletions
+from app.models import Task, Attachment
+from app.schemas import (
+    AttachmentResponse,
+    AttachmentDownloadUrl,
+    AttachmentUploadInitiate,
+    AttachmentUploadTicket,
+    AttachmentUploadComplete,
+)
+from app.storage import (
+    FileTooLargeError,
+    get_storage,
+    get_async_storage,
+    get_cached_download_url_async,
+)
 
 router = APIRouter(prefix="/tasks/{task_id}/attachments", tags=["Attachments"])
 
+# Pre-signed upload URLs are short-lived; the upload token allows an extra
+# hour to call /complete after the PUT finishes
+UPLOAD_URL_EXPIRES = 900  # 15 minutes
+UPLOAD_TOKEN_EXPIRES = UPLOAD_URL_EXPIRES + 3600
+
+
+def file_too_large_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the maximum size of {settings.MAX_UPLOAD_SIZE_MB} MB"
+    )
+
+
+# Sync database helpers for the async endpoints (run via db.run)
+
+def _get_task(db: Session, task_id: int) -> Optional[Task]:
+    return db.query(Task).filter(Task.id == task_id).first()
+
+
+def _get_attachment(db: Session, task_id: int, attachment_id: int) -> Optional[Attachment]:
+    return db.query(Attachment).filter(
+        Attachment.id == attachment_id,
+        Attachment.task_id == task_id
+    ).first()
+
+
+def _get_attachment_by_path(db: Session, task_id: int, file_path: str) -> Optional[Attachment]:
+    return db.query(Attachment).filter(
+        Attachment.task_id == task_id,
+        Attachment.file_path == file_path
+    ).first()
+
+
+def _get_task_attachments(db: Session, task_id: int) -> Optional[List[Attachment]]:
+    """Attachments of a task, or None if the task doesn't exist."""
+    task = _get_task(db, task_id)
+    if not task:
+        return None
+    return list(task.attachments)
+
+
+def _touch_task(db: Session, task_id: int) -> None:
+    """Bump the task's updated_at: its attachments are part of GET /tasks/{id} (and its ETag)."""
+    db.query(Task).filter(Task.id == task_id).update(
+        {Task.updated_at: datetime.utcnow()}, synchronize_session=False
+    )
+
+
+def _save_attachment(db: Session, attachment: Attachment) -> Attachment:
+    db.add(attachment)
+    _touch_task(db, attachment.task_id)
+    db.commit()
+    db.refresh(attachment)
+    return attachment
+
+
+def _delete_attachment(db: Session, attachment: Attachment) -> None:
+    """Delete the record and queue its file, unless a shared blob is still in use."""
+    file_path, blob_sha256 = attachment.file_path, attachment.blob_sha256
+    db.delete(attachment)
+    db.flush()
+    _touch_task(db, attachment.task_id)
+    if blob_sha256:
+        file_path = release_blob(db, blob_sha256)
+    if file_path:
+        enqueue_deletions(db, [file_path])
+    db.commit()
+
+
+def _attach_existing_blob(
+    db: Session, task_id: int, file: UploadFile, sha256: str
+) -> Optional[Attachment]:
+    """Attach already-stored content by reference, or return None if it's new."""
+    blob = acquire_blob(db, sha256)
+    if blob is None:
+        db.rollback()
+        return None
+    attachment = Attachment(
+        filename=file.filename,
+        file_path=blob.file_path,
+        file_size=blob.file_size,
+        content_type=file.content_type,
+        task_id=task_id,
+        blob_sha256=sha256
+    )
+    return _save_attachment(db, attachment)
+
+
+def _attach_new_blob(
+    db: Session, task_id: int, file: UploadFile, sha256: str, file_path: str, file_size: int
+) -> Attachment:
+    blob = register_blob(db, sha256, file_path, file_size, file.content_type)
+    if blob.file_path != file_path:
+        # A concurrent upload stored the same content first: use its copy
+        enqueue_deletions(db, [file_path])
+    attachment = Attachment(
+        filename=file.filename,
+        file_path=blob.file_path,
+        file_size=file_size,
+        content_type=file.content_type,
+        task_id=task_id,
+        blob_sha256=sha256
+    )
+    return _save_attachment(db, attachment)
+
+
+async def _upload_deduplicated(db: Database, task_id: int, file: UploadFile) -> Attachment:
+    """
+    Store an upload content-addressed (CONTENT_ADDRESSED_STORAGE).
+
+    The upload is already spooled to a temp file by the time we get it, so
+    it is hashed first; content we already have is attached by reference
+    without writing anything to storage.
+    """
+    sha256, file_size = await run_in_threadpool(content_digest, file.file, settings.max_upload_size)
+
+    attachment = await db.run(_attach_existing_blob, task_id, file, sha256)
+    if attachment is not None:
+        return attachment
+
+    # New content: write it once, under its digest (and a fresh suffix)
+    file_path = blob_path(get_storage(), sha256)
+    await get_async_storage().put_file(file.file, file_path, file.content_type)
+    return await db.run(_attach_new_blob, task_id, file, sha256, file_path, file_size)
+
 
 @router.get("", response_model=List[AttachmentResponse])
-def get_attachments(
+async def get_attachments(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
     """List all attachments for a task."""
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
+    attachments = await db.run(_get_task_attachments, task_id)
+    if attachments is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
-    return task.attachments
+    return attachments
 
 
 @router.post("", response_model=AttachmentResponse, status_code=status.HTTP_201_CREATED)
 async def upload_attachment(
     task_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
     """
     Upload a file attachment to a task.
 
     The file is stored either locally or in S3 based on the USE_S3 setting.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = await db.run(_get_task, task_id)
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
+    # Don't hold a connection (or SQLite's writer) during the upload
+    await db.release()
+
+    # Reject early when the size is already known from the request
+    if file.size is not None and file.size > settings.max_upload_size:
+        raise file_too_large_exception()
+
+    if settings.CONTENT_ADDRESSED_STORAGE:
+        try:
+            return await _upload_deduplicated(db, task_id, file)
+        except FileTooLargeError:
+            raise file_too_large_exception()
 
     # Get storage backend (local or S3)
-    storage = get_storage()
+    storage = get_async_storage()
 
-    # Upload file
+    # Upload file (streamed in chunks, never read fully into memory)
     folder = f"tasks/{task_id}"
-    file_path, file_size = storage.upload_file(
-        file=file.file,
-        filename=file.filename,
-        folder=folder,
-        content_type=file.content_type
-    )
+    try:
+        file_path, file_size = await storage.upload_file(
+            file=file.file,
+            filename=file.filename,
+            folder=folder,
+            content_type=file.content_type
+        )
+    except FileTooLargeError:
+        raise file_too_large_exception()
 
     # Create attachment record
     attachment = Attachment(
@@ -75,19 +242,158 @@ async def upload_attachment(
         content_type=file.content_type,
         task_id=task_id
     )
-    db.add(attachment)
-    db.commit()
-    db.refresh(attachment)
+    return await db.run(_save_attachment, attachment)
 
-    return attachment
+
+@router.post("/initiate", response_model=AttachmentUploadTicket)
+async def initiate_upload(
+    task_id: int,
+    upload: AttachmentUploadInitiate,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
+):
+    """
+    Start a direct-to-storage upload.
+
+    Returns a pre-signed URL to PUT the file to (with the given headers) and
+    an upload token to pass to /complete once the PUT succeeds.
+    """
+    task = await db.run(_get_task, task_id)
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    if upload.file_size > settings.max_upload_size:
+        raise file_too_large_exception()
+
+    file_path = get_storage().new_file_path(upload.filename, f"tasks/{task_id}")
+    upload_url = await get_async_storage().get_upload_url(file_path, upload.content_type, UPLOAD_URL_EXPIRES)
+    if not upload_url:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not create upload URL"
+        )
+
+    # The token records what was promised, so /complete can check the stored
+    # object against it without any server-side state
+    upload_token = jwt.encode(
+        {
+            "typ": "attachment_upload",
+            "task_id": task_id,
+            "path": file_path,
+            "filename": upload.filename,
+            "content_type": upload.content_type,
+            "size": upload.file_size,
+            "exp": datetime.utcnow() + timedelta(seconds=UPLOAD_TOKEN_EXPIRES),
+        },
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM
+    )
+
+    return {
+        "upload_url": upload_url,
+        "headers": {"Content-Type": upload.content_type},
+        "upload_token": upload_token,
+        "expires_in": UPLOAD_URL_EXPIRES,
+    }
+
+
+@router.post("/complete", response_model=AttachmentResponse, status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+    task_id: int,
+    upload: AttachmentUploadComplete,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
+):
+    """
+    Finish a direct-to-storage upload.
+
+    Checks the stored object (HEAD) matches the size and content type given
+    to /initiate, then creates the attachment record.
+    """
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid or expired upload token"
+    )
+    try:
+        claims = jwt.decode(upload.upload_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise invalid_token_exception
+    if claims.get("typ") != "attachment_upload" or claims.get("task_id") != task_id:
+        raise invalid_token_exception
+
+    task = await db.run(_get_task, task_id)
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+
+    # Completing twice (e.g. a client retry) returns the existing record
+    existing = await db.run(_get_attachment_by_path, task_id, claims["path"])
+    if existing:
+        return existing
+    await db.release()
+
+    storage = get_async_storage()
+    stored = await storage.head_file(claims["path"])
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload not found in storage"
+        )
+    if stored["size"] != claims["size"] or (
+        stored["content_type"] is not None and stored["content_type"] != claims["content_type"]
+    ):
+        await storage.delete_file(claims["path"])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file does not match the initiated upload"
+        )
+
+    attachment = Attachment(
+        filename=claims["filename"],
+        file_path=claims["path"],
+        file_size=stored["size"],
+        content_type=claims["content_type"],
+        task_id=task_id
+    )
+    return await db.run(_save_attachment, attachment)
+
+
+@router.get("/download-urls", response_model=List[AttachmentDownloadUrl])
+async def get_download_urls(
+    task_id: int,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
+):
+    """Get download URLs for every attachment on a task in one call."""
+    attachments = await db.run(_get_task_attachments, task_id)
+    if attachments is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    urls = await asyncio.gather(*(
+        get_cached_download_url_async(attachment.file_path) for attachment in attachments
+    ))
+    return [
+        {
+            "id": attachment.id,
+            "filename": attachment.filename,
+            "download_url": url,
+        }
+        for attachment, url in zip(attachments, urls)
+    ]
 
 
 @router.get("/{attachment_id}/download")
-def download_attachment(
+async def download_attachment(
     task_id: int,
     attachment_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
     """
     Get a download URL for an attachment.
@@ -95,10 +401,7 @@ def download_attachment(
     For S3: Returns a pre-signed URL (temporary, secure access)
     For local: Redirects to the file serving endpoint
     """
-    attachment = db.query(Attachment).filter(
-        Attachment.id == attachment_id,
-        Attachment.task_id == task_id
-    ).first()
+    attachment = await db.run(_get_attachment, task_id, attachment_id)
 
     if not attachment:
         raise HTTPException(
@@ -106,8 +409,7 @@ def download_attachment(
             detail="Attachment not found"
         )
 
-    storage = get_storage()
-    download_url = storage.get_download_url(attachment.file_path)
+    download_url = await get_cached_download_url_async(attachment.file_path)
 
     if settings.USE_S3:
         # Redirect to S3 pre-signed URL
@@ -118,17 +420,14 @@ def download_attachment(
 
 
 @router.delete("/{attachment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_attachment(
+async def delete_attachment(
     task_id: int,
     attachment_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
     """Delete an attachment from a task."""
-    attachment = db.query(Attachment).filter(
-        Attachment.id == attachment_id,
-        Attachment.task_id == task_id
-    ).first()
+    attachment = await db.run(_get_attachment, task_id, attachment_id)
 
     if not attachment:
         raise HTTPException(
@@ -136,10 +435,6 @@ def delete_attachment(
             detail="Attachment not found"
         )
 
-    # Delete file from storage
-    storage = get_storage()
-    storage.delete_file(attachment.file_path)
-
-    # Delete database record
-    db.delete(attachment)
-    db.commit()
+    # Delete the database record; the file is queued for the background
+    # reaper (unless another attachment shares it)
+    await db.run(_delete_attachment, attachment)
@@ -1,25 +1,32 @@
 from datetime import timedelta
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.auth import (
+    CachedUser,
     get_password_hash,
     verify_password,
+    password_needs_rehash,
     create_access_token,
     get_current_active_user,
 )
 from app.config import settings
-from app.database import get_db
+from app.database import Database, get_db, recent_writers
 from app.models import User
 from app.schemas import UserCreate, UserResponse, Token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+# register and login are async so bcrypt can be awaited in its process pool
+# (app/hashing.py) without holding a threadpool thread. Their sync database
+# work runs through db.run (app/database.py), and the connection is released
+# while bcrypt runs.
+
+def _check_user_available(db: Session, user: UserCreate) -> None:
     # Check if email exists
     if db.query(User).filter(User.email == user.email).first():
         raise HTTPException(
@@ -33,10 +40,12 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             detail="Username already taken"
         )
 
+
+def _create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
     db_user = User(
         email=user.email,
         username=user.username,
-        hashed_password=get_password_hash(user.password)
+        hashed_password=hashed_password
     )
     db.add(db_user)
     db.commit()
@@ -44,27 +53,59 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 
+def _get_user_by_username(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+
+def _save_password_hash(db: Session, user: User, hashed_password: str) -> None:
+    db.add(user)
+    user.hashed_password = hashed_password
+    db.commit()
+
+
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(user: UserCreate, db: Database = Depends(get_db)):
+    await db.run(_check_user_available, user)
+    await db.release()
+    hashed_password = await get_password_hash(user.password)
+    db_user = await db.run(_create_user, user, hashed_password)
+    # No token yet for get_db to key on: keep the new user's first reads
+    # (/auth/me, ...) off replicas that haven't seen the row
+    recent_writers.set(user.username, True)
+    return db_user
+
+
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_db)
 ):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.run(_get_user_by_username, form_data.username)
+    await db.release()
+    if not user or not await verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Transparently upgrade the hash if BCRYPT_ROUNDS has changed since it was made
+    if password_needs_rehash(user.hashed_password):
+        hashed_password = await get_password_hash(form_data.password)
+        await db.run(_save_password_hash, user, hashed_password)
+
+    # The token's first reads stay on the primary too: the account (or its
+    # new hash) may be newer than what the replicas have
+    recent_writers.set(form_data.username, True)
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username},
+        data={"sub": form_data.username},
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_active_user)):
+async def get_me(current_user: CachedUser = Depends(get_current_active_user)):
     return current_user
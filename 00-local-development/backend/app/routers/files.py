@@ -0,0 +1,241 @@
+# =============================================================================
+# FILES ROUTER (local storage only)
+# =============================================================================
+# Stand-ins for what S3 does for us in production, so the local backend
+# supports the same flows offline:
+#   PUT /files/upload        pre-signed direct upload
+#   GET /files/{file_path}   pre-signed download, with Range / ETag / 304 like S3
+
+import mimetypes
+import os
+import re
+import stat as stat_module
+from typing import Optional
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from app.config import settings
+from app.http_cache import http_date, is_not_modified
+from app.storage import LocalStorage, get_storage
+
+router = APIRouter(prefix="/files", tags=["Files"])
+
+# Fallback read size when the server can't sendfile
+SEND_CHUNK_SIZE = 256 * 1024
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRangeResponse(Response):
+    """
+    Send [start, end] of a file.
+
+    Uses the ASGI zero-copy extension (os.sendfile in the server) when the
+    server offers it; otherwise streams the file in chunks read off the
+    event loop.
+    """
+
+    def __init__(self, path: str, start: int, end: int, status_code: int, headers: dict, send_body: bool = True):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.length = end - start + 1
+        self.send_body = send_body
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if not self.send_body or self.length <= 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                })
+            return
+
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await f.read(min(SEND_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                # File shrank underneath us; end the response cleanly
+                await send({"type": "http.response.body", "body": b""})
+
+
+def _resolve_local_path(file_path: str, base_dir: str) -> Optional[str]:
+    """Resolve a requested path, refusing anything outside the storage directory."""
+    base = os.path.realpath(base_dir)
+    full = os.path.realpath(file_path)
+    if os.path.commonpath([base, full]) != base or full == base:
+        return None
+    return full
+
+
+def _parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single "bytes=" range into (start, end), inclusive.
+
+    Returns None for syntax we don't serve partially (e.g. multiple ranges),
+    so the caller sends the whole file; raises 416 if the range can't be met.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            start = size
+        else:
+            start = max(size - length, 0)
+        end = size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    if start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_local_file(file_path: str, request: Request, token: Optional[str] = None):
+    """
+    Serve a locally stored attachment (the URL from LocalStorage.get_download_url).
+
+    The token in the URL authorizes this one path until it expires, like an
+    S3 pre-signed URL; without a valid one the answer is 403. Supports single
+    byte ranges for resumable/partial downloads and conditional requests
+    (If-None-Match / If-Modified-Since -> 304).
+    """
+    storage = get_storage()
+    if settings.USE_S3 or not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+
+    if not token or not LocalStorage.verify_download_token(token, file_path):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired download URL"
+        )
+
+    not_found = HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    path = _resolve_local_path(file_path, storage.base_dir)
+    if path is None:
+        raise not_found
+    try:
+        stat = await anyio.to_thread.run_sync(os.stat, path)
+    except OSError:
+        raise not_found
+    if not stat_module.S_ISREG(stat.st_mode):
+        raise not_found
+
+    size = stat.st_size
+    # Stored files are never rewritten in place (new uploads get new names),
+    # so size + mtime is a safe strong validator
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=0, must-revalidate",
+    }
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    headers["Content-Type"] = content_type
+    send_body = request.method == "GET"
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header:
+        # If-Range: only honour the range if the client's copy is current
+        if_range = request.headers.get("if-range")
+        if not if_range or if_range == etag or if_range == headers["Last-Modified"]:
+            byte_range = _parse_range(range_header, size)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return FileRangeResponse(path, 0, size - 1, status.HTTP_200_OK, headers, send_body)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return FileRangeResponse(path, start, end, status.HTTP_206_PARTIAL_CONTENT, headers, send_body)
+
+
+@router.put("/upload", status_code=status.HTTP_200_OK)
+async def local_presigned_upload(token: str, request: Request):
+    """
+    Receive a direct upload (the local equivalent of a pre-signed S3 PUT).
+
+    The token from LocalStorage.get_upload_url authorizes one path, and the
+    Content-Type header must match the one it was signed for - as with S3.
+    """
+    if settings.USE_S3:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+
+    signed = LocalStorage.verify_upload_token(token)
+    if signed is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired upload URL"
+        )
+    file_path, content_type = signed
+    if request.headers.get("content-type") != content_type:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Content-Type does not match the signed upload"
+        )
+
+    await run_in_threadpool(os.makedirs, os.path.dirname(file_path), exist_ok=True)
+
+    # Stream the body to disk without blocking the event loop on writes
+    file_size = 0
+    f = await run_in_threadpool(open, file_path, "wb")
+    try:
+        async for chunk in request.stream():
+            file_size += len(chunk)
+            if file_size > settings.max_upload_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File exceeds the maximum size of {settings.MAX_UPLOAD_SIZE_MB} MB"
+                )
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        f.close()
+        os.remove(file_path)
+        raise
+    f.close()
+
+    return {"file_path": file_path, "file_size": file_size}
@@ -1,60 +1,479 @@
+from collections import Counter
+from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from app.auth import get_current_active_user
-from app.database import get_db
-from app.models import Task, User, TaskStatus
-from app.schemas import TaskCreate, TaskUpdate, TaskResponse, TaskListResponse
-from app.storage import get_storage
+from app.auth import CachedUser, get_current_active_user
+from app.blobs import release_blob
+from app.config import settings
+from app.database import Database, get_db
+from app.deletions import enqueue_deletions
+from app.http_cache import is_not_modified, make_etag, not_modified_response, validator_headers
+from app.models import Attachment, Task, TaskStatus, User
+from app.pagination import NEXT_CURSOR_HEADER, keyset_paginate, set_next_cursor
+from app.schemas import (
+    BulkItemError,
+    TaskBulkCreate,
+    TaskBulkDelete,
+    TaskBulkResult,
+    TaskBulkUpdate,
+    TaskCreate,
+    TaskUpdate,
+    TaskResponse,
+    TaskListResponse,
+    TaskStats,
+)
+from app.search import search_paginate, set_search_cursor
+from app.serialization import (
+    TASK_FIELDS,
+    TASK_LIST_FIELDS,
+    attachment_items,
+    json_response,
+    parse_fields,
+    sparse_task_item,
+    sparse_task_query,
+    task_list_item,
+    task_list_query,
+)
+from app.stats import apply_counter_deltas, count_task, get_task_stats
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+# Endpoints are async; each runs its sync database work (the _name function
+# next to it) in one db.run call - see app/database.py.
+
+# Eager-load what TaskResponse serializes, so a task costs a fixed number of
+# queries instead of one extra per relationship row (N+1).
+# To-one relationships ride along in a JOIN; to-many use one extra SELECT ... IN.
+# (Lists select plain columns instead; see app/serialization.py.)
+TASK_DETAIL_OPTIONS = (
+    joinedload(Task.creator),
+    joinedload(Task.assignee),
+    selectinload(Task.attachments),
+)
+
+
+def load_task(db: Session, task_id: int) -> Optional[Task]:
+    """Load a task with everything TaskResponse needs."""
+    return db.query(Task).options(*TASK_DETAIL_OPTIONS).filter(Task.id == task_id).first()
+
+
+def queue_attachment_files(db: Session, attachments: list[tuple[str, Optional[str]]]) -> None:
+    """
+    Queue the files of deleted (and flushed) attachments, given as
+    (file_path, blob_sha256) pairs, for the background reaper. Shared blobs
+    only go when these attachments held the last reference.
+    """
+    file_paths = [file_path for file_path, sha256 in attachments if not sha256]
+    for sha256, count in Counter(sha256 for _, sha256 in attachments if sha256).items():
+        file_path = release_blob(db, sha256, count)
+        if file_path:
+            file_paths.append(file_path)
+    enqueue_deletions(db, file_paths)
+
+
+# =============================================================================
+# BULK HELPERS
+# =============================================================================
+# The bulk endpoints check every item with a few IN queries, then apply the
+# valid ones with one statement per BULK_BATCH_SIZE rows, all in a single
+# transaction. Items that fail a check are reported, not fatal.
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _check_bulk_size(count: int) -> None:
+    if count > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items per bulk request"
+        )
+
+
+def _current_values(db: Session, task_ids: set[int]) -> dict[int, dict]:
+    """
+    The counted fields (see app/stats.py) of the tasks that exist, by id.
+
+    The rows stay locked until commit, so a concurrent write can't change
+    them between this read and the counter update. Locked in id order, so
+    overlapping bulk requests can't deadlock.
+    """
+    found = {}
+    for batch in _chunks(sorted(task_ids), settings.BULK_BATCH_SIZE):
+        rows = db.execute(
+            select(Task.id, Task.status, Task.priority, Task.assignee_id)
+            .where(Task.id.in_(batch))
+            .order_by(Task.id)
+            .with_for_update()
+        )
+        found.update(
+            (row.id, {"status": row.status, "priority": row.priority, "assignee_id": row.assignee_id})
+            for row in rows
+        )
+    return found
+
+
+def _existing_ids(db: Session, column, ids: set[int]) -> set[int]:
+    """Which of ids exist in column."""
+    found = set()
+    for batch in _chunks(list(ids), settings.BULK_BATCH_SIZE):
+        found.update(db.scalars(select(column).where(column.in_(batch))))
+    return found
+
+
+def _get_tasks(
+    db: Session,
+    request: Request,
+    response: Response,
+    status: Optional[TaskStatus],
+    assignee_id: Optional[int],
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[str]
+) -> Response:
+    requested = parse_fields(fields, TASK_LIST_FIELDS)
+    filters = []
+    if status:
+        filters.append(Task.status == status)
+    if assignee_id:
+        filters.append(Task.assignee_id == assignee_id)
+
+    def page(query):
+        query = keyset_paginate(query.filter(*filters), Task, cursor, limit)
+        return query if cursor else query.offset(skip)
+
+    # The ETag covers exactly this page: its tasks' ids and updated_at (plus
+    # the look-ahead row, which decides X-Next-Cursor). Same seek and limit
+    # as the page itself, so it costs O(limit) however many tasks match.
+    versions = page(db.query(Task.id, Task.created_at, Task.updated_at)).all()
+    etag = make_etag(
+        "tasks", status, assignee_id, skip, limit, cursor, requested,
+        [(row.id, row.updated_at) for row in versions]
+    )
+    headers = validator_headers(etag)
+    if is_not_modified(request, etag):
+        set_next_cursor(response, versions, limit)
+        next_cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        return not_modified_response({**headers, NEXT_CURSOR_HEADER: next_cursor} if next_cursor else headers)
+    response.headers.update(headers)
+
+    # Plain rows straight to JSON (app/serialization.py)
+    query = sparse_task_query(db, requested) if requested else task_list_query(db)
+    rows = set_next_cursor(response, page(query).all(), limit)
+    if requested:
+        return json_response([sparse_task_item(row, requested) for row in rows], response)
+    return json_response([task_list_item(row) for row in rows], response)
+
 
 @router.get("", response_model=List[TaskListResponse])
-def get_tasks(
+async def get_tasks(
+    request: Request,
+    response: Response,
     status: Optional[TaskStatus] = None,
     assignee_id: Optional[int] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
-    query = db.query(Task)
+    """
+    List tasks, newest first.
+
+    `fields` returns only those keys (any TaskResponse field except
+    attachments), reading only the columns and joins they need.
+
+    Pass the X-Next-Cursor header from the previous page as `cursor` to page
+    with a keyset seek instead of OFFSET; `skip` is ignored when a cursor is given.
+
+    Sends an ETag built from the filters and the page's task ids and
+    updated_at; If-None-Match with it gets a 304 after one id-only page
+    query, without loading or serializing the tasks. (If-Modified-Since
+    isn't used here: a deleted task doesn't move the latest updated_at.)
+    """
+    return await db.run(_get_tasks, request, response, status, assignee_id, skip, limit, cursor, fields)
+
+
+@router.get("/stats", response_model=TaskStats)
+async def task_stats(
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
+):
+    """
+    Task counts in total and by status, priority and assignee.
+
+    Served from counters the task endpoints keep up to date, so this is a
+    small read however many tasks there are. `by_assignee` is keyed by user
+    id, with "none" for unassigned tasks.
+    """
+    return await db.run(get_task_stats)
+
+
+def _search_tasks(
+    db: Session,
+    response: Response,
+    q: str,
+    status: Optional[TaskStatus],
+    assignee_id: Optional[int],
+    limit: int,
+    cursor: Optional[str]
+) -> Response:
+    query = task_list_query(db)
 
     if status:
         query = query.filter(Task.status == status)
     if assignee_id:
         query = query.filter(Task.assignee_id == assignee_id)
 
-    tasks = query.order_by(Task.created_at.desc()).offset(skip).limit(limit).all()
-    return tasks
+    rows = set_search_cursor(response, search_paginate(query, q, cursor, limit).all(), limit)
+    return json_response([task_list_item(row) for row in rows], response)
 
 
-@router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
-def create_task(
-    task: TaskCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+@router.get("/search", response_model=List[TaskListResponse])
+async def search_tasks(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[TaskStatus] = None,
+    assignee_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
+    """
+    Full-text search over task titles and descriptions, best matches first.
+
+    Title matches rank above description matches. The filters and the
+    X-Next-Cursor paging work as in GET /tasks.
+    """
+    return await db.run(_search_tasks, response, q, status, assignee_id, limit, cursor)
+
+
+def _create_task(db: Session, task: TaskCreate, creator_id: int) -> Task:
     db_task = Task(
         **task.model_dump(),
-        creator_id=current_user.id
+        creator_id=creator_id
     )
     db.add(db_task)
+    db.flush()
+    task_id = db_task.id
+
+    deltas = Counter()
+    count_task(deltas, db_task.status, db_task.priority, db_task.assignee_id)
+    apply_counter_deltas(db, deltas)
     db.commit()
-    db.refresh(db_task)
-    return db_task
+    return load_task(db, task_id)
 
 
-@router.get("/{task_id}", response_model=TaskResponse)
-def get_task(
-    task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+@router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
+async def create_task(
+    task: TaskCreate,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
+):
+    return await db.run(_create_task, task, current_user.id)
+
+
+def _bulk_create_tasks(db: Session, payload: TaskBulkCreate, creator_id: int) -> TaskBulkResult:
+    assignee_ids = {item.assignee_id for item in payload.tasks if item.assignee_id is not None}
+    assignees = _existing_ids(db, User.id, assignee_ids)
+
+    rows, errors = [], []
+    for index, item in enumerate(payload.tasks):
+        if item.assignee_id is not None and item.assignee_id not in assignees:
+            errors.append(BulkItemError(index=index, detail="Assignee not found"))
+            continue
+        rows.append({**item.model_dump(), "creator_id": creator_id})
+
+    deltas = Counter()
+    for row in rows:
+        count_task(deltas, TaskStatus.TODO, row["priority"], row["assignee_id"])
+
+    # render_nulls keeps rows with and without e.g. an assignee in the same
+    # statement (otherwise the ORM splits the batch wherever NULLs change).
+    # RETURNING doesn't promise row order, but ids are handed out in VALUES
+    # order, so sorting each batch lines them up with the request
+    # (sort_by_parameter_order would fall back to one INSERT per row on SQLite).
+    ids = []
+    for batch in _chunks(rows, settings.BULK_BATCH_SIZE):
+        ids.extend(sorted(db.scalars(
+            insert(Task).returning(Task.id),
+            batch,
+            execution_options={"render_nulls": True}
+        )))
+    apply_counter_deltas(db, deltas)
+    db.commit()
+    return TaskBulkResult(ids=ids, errors=errors)
+
+
+@router.post("/bulk", response_model=TaskBulkResult)
+async def bulk_create_tasks(
+    payload: TaskBulkCreate,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
+):
+    """
+    Create many tasks in one transaction (multi-row INSERTs).
+
+    Items with an unknown assignee are reported in `errors`; the rest are
+    created and their ids returned in request order.
+    """
+    _check_bulk_size(len(payload.tasks))
+    return await db.run(_bulk_create_tasks, payload, current_user.id)
+
+
+def _bulk_update_tasks(db: Session, payload: TaskBulkUpdate) -> TaskBulkResult:
+    current = _current_values(db, {item.id for item in payload.tasks})
+    assignee_ids = {item.assignee_id for item in payload.tasks if item.assignee_id is not None}
+    assignees = _existing_ids(db, User.id, assignee_ids)
+
+    rows, errors, seen = [], [], set()
+    deltas = Counter()
+    now = datetime.utcnow()
+    for index, item in enumerate(payload.tasks):
+        data = item.model_dump(exclude_unset=True)
+        if item.id not in current:
+            detail = "Task not found"
+        elif item.id in seen:
+            detail = "Duplicate task id"
+        elif "title" in data and data["title"] is None:
+            detail = "title cannot be null"
+        elif data.get("assignee_id") is not None and data["assignee_id"] not in assignees:
+            detail = "Assignee not found"
+        else:
+            seen.add(item.id)
+            rows.append({**data, "updated_at": now})
+            old = current[item.id]
+            new = {**old, **{key: data[key] for key in old if key in data}}
+            count_task(deltas, **old, sign=-1)
+            count_task(deltas, **new)
+            continue
+        errors.append(BulkItemError(index=index, id=item.id, detail=detail))
+
+    # One executemany per set of changed fields: group rows that change the
+    # same fields together
+    ids = [row["id"] for row in rows]
+    rows.sort(key=lambda row: sorted(row))
+    for batch in _chunks(rows, settings.BULK_BATCH_SIZE):
+        db.execute(update(Task), batch)
+    apply_counter_deltas(db, deltas)
+    db.commit()
+    return TaskBulkResult(ids=ids, errors=errors)
+
+
+@router.patch("/bulk", response_model=TaskBulkResult)
+async def bulk_update_tasks(
+    payload: TaskBulkUpdate,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
+):
+    """
+    Update many tasks in one transaction.
+
+    Each item is a task id plus the fields to change, as in PATCH /tasks/{id};
+    they are applied as UPDATE-by-primary-key batches.
+    """
+    _check_bulk_size(len(payload.tasks))
+    return await db.run(_bulk_update_tasks, payload)
+
+
+def _bulk_delete_tasks(db: Session, payload: TaskBulkDelete, user_id: int) -> TaskBulkResult:
+    owners = {}
+    for batch in _chunks(sorted(set(payload.ids)), settings.BULK_BATCH_SIZE):
+        rows = db.execute(
+            select(Task.id, Task.creator_id, Task.assignee_id, Task.status, Task.priority)
+            .where(Task.id.in_(batch))
+            .order_by(Task.id)
+            .with_for_update()
+        )
+        owners.update((row.id, row) for row in rows)
+
+    ids, errors, seen = [], [], set()
+    deltas = Counter()
+    for index, task_id in enumerate(payload.ids):
+        task = owners.get(task_id)
+        if task is None:
+            detail = "Task not found"
+        elif task_id in seen:
+            detail = "Duplicate task id"
+        elif user_id not in (task.creator_id, task.assignee_id):
+            detail = "Not authorized to delete this task"
+        else:
+            seen.add(task_id)
+            ids.append(task_id)
+            count_task(deltas, task.status, task.priority, task.assignee_id, sign=-1)
+            continue
+        errors.append(BulkItemError(index=index, id=task_id, detail=detail))
+
+    attachments = []
+    for batch in _chunks(ids, settings.BULK_BATCH_SIZE):
+        attachments.extend(db.execute(
+            select(Attachment.file_path, Attachment.blob_sha256).where(Attachment.task_id.in_(batch))
+        ).tuples())
+        db.execute(
+            delete(Attachment).where(Attachment.task_id.in_(batch)),
+            execution_options={"synchronize_session": False}
+        )
+        db.execute(
+            delete(Task).where(Task.id.in_(batch)),
+            execution_options={"synchronize_session": False}
+        )
+    queue_attachment_files(db, attachments)
+    apply_counter_deltas(db, deltas)
+    db.commit()
+    return TaskBulkResult(ids=ids, errors=errors)
+
+
+@router.post("/bulk/delete", response_model=TaskBulkResult)
+async def bulk_delete_tasks(
+    payload: TaskBulkDelete,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
+    """
+    Delete many tasks, and their attachments, in one transaction.
+
+    As with DELETE /tasks/{id}, only the creator or assignee may delete a
+    task; other ids are reported in `errors`.
+    """
+    _check_bulk_size(len(payload.ids))
+    return await db.run(_bulk_delete_tasks, payload, current_user.id)
+
+
+def _get_task(db: Session, task_id: int, request: Request, response: Response, fields: Optional[str]):
+    version = db.query(Task.updated_at).filter(Task.id == task_id).first()
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+
+    requested = parse_fields(fields, TASK_FIELDS)
+    updated_at = version.updated_at
+    etag = make_etag("task", task_id, updated_at, requested)
+    headers = validator_headers(etag, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+
+    if requested:
+        row = sparse_task_query(db, requested).filter(Task.id == task_id).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+        attachments = attachment_items(db, task_id) if "attachments" in requested else None
+        return json_response(sparse_task_item(row, requested, attachments), response)
+
+    task = load_task(db, task_id)
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -63,36 +482,62 @@ def get_task(
     return task
 
 
-@router.patch("/{task_id}", response_model=TaskResponse)
-def update_task(
+@router.get("/{task_id}", response_model=TaskResponse)
+async def get_task(
     task_id: int,
-    task_update: TaskUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,attachments"),
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
+    """
+    Get a task with its creator, assignee and attachments.
+
+    `fields` returns only those keys; relationships that aren't asked for
+    aren't joined or loaded.
+
+    ETag and Last-Modified come from updated_at (attachment changes bump it
+    too), so a conditional request is answered with a 304 after a primary
+    key lookup, without loading the task.
+    """
+    return await db.run(_get_task, task_id, request, response, fields)
+
+
+def _update_task(db: Session, task_id: int, task_update: TaskUpdate) -> Task:
+    # Locked until commit: the counter deltas are computed from these values
+    task = db.query(Task).filter(Task.id == task_id).with_for_update().first()
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
 
+    deltas = Counter()
+    count_task(deltas, task.status, task.priority, task.assignee_id, sign=-1)
+
     update_data = task_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(task, field, value)
 
+    count_task(deltas, task.status, task.priority, task.assignee_id)
+    apply_counter_deltas(db, deltas)
     db.commit()
-    db.refresh(task)
-    return task
+    return load_task(db, task_id)
 
 
-@router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_task(
+@router.patch("/{task_id}", response_model=TaskResponse)
+async def update_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    task_update: TaskUpdate,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
+    return await db.run(_update_task, task_id, task_update)
+
+
+def _delete_task(db: Session, task_id: int, user_id: int) -> None:
+    task = db.query(Task).filter(Task.id == task_id).with_for_update().first()
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -100,18 +545,29 @@ def delete_task(
         )
 
     # Allow creator or assignee to delete
-    if task.creator_id != current_user.id and task.assignee_id != current_user.id:
+    if task.creator_id != user_id and task.assignee_id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to delete this task"
         )
 
-    # Delete attachment files from storage before deleting task
-    if task.attachments:
-        storage = get_storage()
-        for attachment in task.attachments:
-            storage.delete_file(attachment.file_path)
-
-    # Delete task (attachments cascade delete from DB)
+    # Remember which files the attachments use, then delete the task
+    # (attachments cascade delete from DB) and queue the files in the same
+    # transaction
+    attachments = [(a.file_path, a.blob_sha256) for a in task.attachments]
+    deltas = Counter()
+    count_task(deltas, task.status, task.priority, task.assignee_id, sign=-1)
     db.delete(task)
+    db.flush()
+    queue_attachment_files(db, attachments)
+    apply_counter_deltas(db, deltas)
     db.commit()
+
+
+@router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_task(
+    task_id: int,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
+):
+    await db.run(_delete_task, task_id, current_user.id)
@@ -1,22 +1,36 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 
-from app.auth import get_current_active_user
-from app.database import get_db
+from app.auth import CachedUser, get_current_active_user
+from app.database import Database, get_db
 from app.models import User
+from app.pagination import keyset_paginate, set_next_cursor
 from app.schemas import UserResponse
+from app.serialization import json_response, user_item, user_query
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
+def _get_users(db: Session, response: Response, skip: int, limit: int, cursor: Optional[str]) -> Response:
+    # Plain rows straight to JSON (app/serialization.py)
+    query = user_query(db).filter(User.is_active == True)
+    query = keyset_paginate(query, User, cursor, limit, descending=False)
+    if not cursor:
+        query = query.offset(skip)
+
+    rows = set_next_cursor(response, query.all(), limit)
+    return json_response([user_item(row) for row in rows], response)
+
+
 @router.get("", response_model=List[UserResponse])
-def get_users(
+async def get_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
-    users = db.query(User).filter(User.is_active == True).offset(skip).limit(limit).all()
-    return users
+    return await db.run(_get_users, response, skip, limit, cursor)
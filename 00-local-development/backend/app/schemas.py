@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 from pydantic import BaseModel, EmailStr
 
 from app.models import TaskStatus, TaskPriority
@@ -50,6 +50,30 @@ class AttachmentResponse(AttachmentBase):
         from_attributes = True
 
 
+class AttachmentDownloadUrl(BaseModel):
+    id: int
+    filename: str
+    download_url: str
+
+
+class AttachmentUploadInitiate(BaseModel):
+    filename: str
+    content_type: str
+    file_size: int
+
+
+class AttachmentUploadTicket(BaseModel):
+    upload_url: str
+    method: str = "PUT"
+    headers: dict[str, str]
+    upload_token: str
+    expires_in: int
+
+
+class AttachmentUploadComplete(BaseModel):
+    upload_token: str
+
+
 # Task schemas
 class TaskBase(BaseModel):
     title: str
@@ -71,6 +95,40 @@ class TaskUpdate(BaseModel):
     assignee_id: Optional[int] = None
 
 
+class TaskBulkUpdateItem(TaskUpdate):
+    id: int
+
+
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate]
+
+
+class TaskBulkUpdate(BaseModel):
+    tasks: List[TaskBulkUpdateItem]
+
+
+class TaskBulkDelete(BaseModel):
+    ids: List[int]
+
+
+class BulkItemError(BaseModel):
+    index: int  # Position in the request array
+    id: Optional[int] = None
+    detail: str
+
+
+class TaskBulkResult(BaseModel):
+    ids: List[int]  # Tasks created / updated / deleted, in request order
+    errors: List[BulkItemError]
+
+
+class TaskStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+    by_assignee: Dict[str, int]
+
+
 class TaskResponse(TaskBase):
     id: int
     status: TaskStatus
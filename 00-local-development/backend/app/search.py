@@ -0,0 +1,147 @@
+# =============================================================================
+# FULL-TEXT SEARCH
+# =============================================================================
+# Task titles and descriptions are indexed by the database itself:
+#
+#   SQLite:      an FTS5 table (tasks_fts) over the tasks table, kept in sync
+#                by triggers on insert/update/delete
+#   PostgreSQL:  a generated tsvector column (tasks.search_vector) with a GIN
+#                index, recomputed by the database on every write
+#
+# Both stay in sync with any write - ORM, bulk statements or raw SQL - since
+# nothing in Python has to remember to update them. Neither is a mapped
+# column, so the DDL lives here (run after create_all) and in migration
+# 0005; alembic/env.py leaves these objects out of autogenerate.
+#
+# NOTE: on SQLite a batch migration that rebuilds the tasks table drops its
+# triggers; such a migration must recreate them (SQLITE_TRIGGERS).
+#
+# Ranking: matches in the title weigh more than matches in the description.
+# Results are ordered by (rank, id) with lower rank = better on both
+# databases, and paged with a keyset cursor on that pair.
+
+import re
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DDL, Double, and_, cast, column, event, func, literal_column, or_, table
+
+from app.models import Task
+from app.pagination import NEXT_CURSOR_HEADER, decode_position, encode_position, invalid_cursor_exception
+
+# Relative weight of a title match vs a description match (SQLite bm25)
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE tasks_fts USING fts5(
+        title, description,
+        content='tasks', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    *SQLITE_TRIGGERS,
+]
+
+POSTGRES_DDL = [
+    """
+    ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)",
+]
+
+# Databases created with Base.metadata.create_all() get the index too
+for statement in SQLITE_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+WORD_PATTERN = re.compile(r"\w+")
+
+tasks_fts = table("tasks_fts", column("rowid"))
+
+
+def fts5_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query: every word must match, and the last
+    one may be a prefix (search-as-you-type). Words are quoted, so FTS5
+    operators in user input are treated as plain text.
+    """
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query must contain at least one word"
+        )
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def search_paginate(query, text: str, cursor: Optional[str], limit: int):
+    """
+    Restrict a Task query to full-text matches for text, best first.
+
+    Adds a rank column to the rows and, like keyset_paginate, seeks past
+    the cursor and fetches limit + 1 rows.
+    """
+    # The session's actual database (DATABASE_URL is unset with Secrets Manager)
+    if query.session.get_bind().dialect.name == "sqlite":
+        match_table = literal_column("tasks_fts")
+        rank = func.bm25(match_table, TITLE_WEIGHT, DESCRIPTION_WEIGHT)
+        query = query.join(tasks_fts, tasks_fts.c.rowid == Task.id).filter(
+            match_table.op("MATCH")(fts5_query(text))
+        )
+    else:
+        search_vector = literal_column("tasks.search_vector")
+        ts_query = func.websearch_to_tsquery("english", text)
+        # ts_rank is a float4; as double it round-trips exactly through the cursor
+        rank = -cast(func.ts_rank(search_vector, ts_query), Double)
+        query = query.filter(search_vector.op("@@")(ts_query))
+
+    if cursor:
+        try:
+            after_rank, after_id = decode_position(cursor)
+            after_rank, after_id = float(after_rank), int(after_id)
+        except (ValueError, TypeError):
+            raise invalid_cursor_exception()
+        query = query.filter(or_(
+            rank > after_rank,
+            and_(rank == after_rank, Task.id > after_id)
+        ))
+
+    return query.add_columns(rank.label("rank")).order_by(rank, Task.id).limit(limit + 1)
+
+
+def set_search_cursor(response: Response, rows: list, limit: int) -> list:
+    """Like set_next_cursor, for the ranked rows of search_paginate."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_position([last.rank, last.id])
+    return rows
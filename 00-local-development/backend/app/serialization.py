@@ -0,0 +1,188 @@
+# =============================================================================
+# FAST LIST SERIALIZATION
+# =============================================================================
+# A page of GET /tasks used to cost far more in Python than in the database:
+# build ORM objects, validate each through TaskListResponse (and its nested
+# UserResponse), then encode the result. List endpoints take a shortcut:
+#
+#   - select just the columns the response shows, as plain rows
+#   - build the dicts directly, in the schema's field order
+#   - encode with orjson
+#
+# The output is the same bytes the response_model path produces (same keys,
+# order and date format); scripts/bench_list_serialization.py checks that
+# and times both. The routes keep response_model for the OpenAPI docs, but
+# return a ready Response, so FastAPI doesn't validate the rows again.
+#
+# Adding a field to TaskListResponse or UserResponse means adding it here.
+
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException, Response, status
+from sqlalchemy.orm import Query, Session, aliased
+
+from app.models import Attachment, Task, User
+
+Assignee = aliased(User, name="assignee")
+Creator = aliased(User, name="creator")
+
+# Columns of UserResponse, in its field order
+USER_COLUMNS = (User.email, User.username, User.id, User.is_active, User.created_at)
+
+# Columns of TaskListResponse, in its field order, then the assignee's
+TASK_LIST_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.status,
+    Task.priority,
+    Task.due_date,
+    Task.created_at,
+    Assignee.email.label("assignee_email"),
+    Assignee.username.label("assignee_username"),
+    Assignee.id.label("assignee_id"),
+    Assignee.is_active.label("assignee_is_active"),
+    Assignee.created_at.label("assignee_created_at"),
+)
+
+
+def task_list_query(db: Session) -> Query:
+    """Rows for TaskListResponse; filter/paginate it like db.query(Task)."""
+    return db.query(*TASK_LIST_COLUMNS).outerjoin(Assignee, Task.assignee_id == Assignee.id)
+
+
+def user_query(db: Session) -> Query:
+    """Rows for UserResponse; filter/paginate it like db.query(User)."""
+    return db.query(*USER_COLUMNS)
+
+
+def user_item(row) -> dict:
+    return {
+        "email": row.email,
+        "username": row.username,
+        "id": row.id,
+        "is_active": row.is_active,
+        "created_at": row.created_at,
+    }
+
+
+def task_list_item(row) -> dict:
+    assignee = None
+    if row.assignee_id is not None:
+        assignee = {
+            "email": row.assignee_email,
+            "username": row.assignee_username,
+            "id": row.assignee_id,
+            "is_active": row.assignee_is_active,
+            "created_at": row.assignee_created_at,
+        }
+    return {
+        "id": row.id,
+        "title": row.title,
+        "status": row.status,
+        "priority": row.priority,
+        "due_date": row.due_date,
+        "created_at": row.created_at,
+        "assignee": assignee,
+    }
+
+
+def json_response(content, response: Response) -> Response:
+    """
+    Encode content with orjson, keeping the headers the endpoint set on its
+    injected Response (FastAPI only merges those into responses it builds).
+    """
+    return Response(
+        content=orjson.dumps(content),
+        media_type="application/json",
+        headers=dict(response.headers)
+    )
+
+
+# =============================================================================
+# SPARSE FIELDSETS
+# =============================================================================
+# ?fields=id,title,status on the task endpoints returns just those keys, in
+# the order asked for. The query selects only the matching columns, joins a
+# user only for "creator"/"assignee", and reads attachments only when asked,
+# so every layer does less work. Without fields=, responses are unchanged.
+
+TASK_SCALAR_FIELDS = (
+    "id", "title", "description", "status", "priority", "due_date",
+    "created_at", "updated_at", "creator_id", "assignee_id",
+)
+TASK_USER_FIELDS = {
+    "creator": (Creator, Task.creator_id),
+    "assignee": (Assignee, Task.assignee_id),
+}
+TASK_LIST_FIELDS = TASK_SCALAR_FIELDS + tuple(TASK_USER_FIELDS)
+TASK_FIELDS = TASK_LIST_FIELDS + ("attachments",)
+
+# UserResponse / AttachmentResponse field order
+USER_FIELDS = ("email", "username", "id", "is_active", "created_at")
+ATTACHMENT_COLUMNS = (
+    Attachment.filename,
+    Attachment.id,
+    Attachment.file_path,
+    Attachment.file_size,
+    Attachment.content_type,
+    Attachment.uploaded_at,
+)
+
+
+def parse_fields(fields: Optional[str], allowed: tuple) -> Optional[list[str]]:
+    """Split a fields= value into known field names (None if not given). Raises 400."""
+    if fields is None:
+        return None
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown) or '(none given)'}. Choose from: {', '.join(allowed)}"
+        )
+    return requested
+
+
+def sparse_task_query(db: Session, fields: list[str]) -> Query:
+    """Rows with only the columns (and joins) fields need; filter/paginate like db.query(Task)."""
+    # id and created_at are always read: paging and cursors need them
+    columns = [Task.id.label("id"), Task.created_at.label("created_at")]
+    columns += [
+        getattr(Task, name).label(name)
+        for name in fields
+        if name in TASK_SCALAR_FIELDS and name not in ("id", "created_at")
+    ]
+    users = [name for name in fields if name in TASK_USER_FIELDS]
+    for name in users:
+        user, _ = TASK_USER_FIELDS[name]
+        columns += [getattr(user, field).label(f"{name}__{field}") for field in USER_FIELDS]
+
+    query = db.query(*columns)
+    for name in users:
+        user, foreign_key = TASK_USER_FIELDS[name]
+        query = query.outerjoin(user, foreign_key == user.id)
+    return query
+
+
+def attachment_items(db: Session, task_id: int) -> list[dict]:
+    rows = db.query(*ATTACHMENT_COLUMNS).filter(Attachment.task_id == task_id).order_by(Attachment.id)
+    return [
+        {column.key: value for column, value in zip(ATTACHMENT_COLUMNS, row)}
+        for row in rows
+    ]
+
+
+def sparse_task_item(row, fields: list[str], attachments: Optional[list] = None) -> dict:
+    item = {}
+    for name in fields:
+        if name in TASK_USER_FIELDS:
+            if getattr(row, f"{name}__id") is None:
+                item[name] = None
+            else:
+                item[name] = {field: getattr(row, f"{name}__{field}") for field in USER_FIELDS}
+        elif name == "attachments":
+            item[name] = attachments
+        else:
+            item[name] = getattr(row, name)
+    return item
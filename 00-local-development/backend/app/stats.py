@@ -0,0 +1,108 @@
+# =============================================================================
+# TASK STATISTICS
+# =============================================================================
+# GET /tasks/stats reads the task_counters table instead of counting tasks,
+# so its cost doesn't grow with the number of tasks.
+#
+# Every endpoint that creates, updates or deletes tasks records what changed
+# in a Counter of deltas:
+#
+#   deltas = Counter()
+#   count_task(deltas, old.status, old.priority, old.assignee_id, sign=-1)
+#   count_task(deltas, new.status, new.priority, new.assignee_id)
+#   apply_counter_deltas(db, deltas)      # one upsert, same transaction
+#
+# Counter rows stay locked from the upsert until commit, so on PostgreSQL
+# every create and delete queues on the total row for that moment (see
+# README); keep apply_counter_deltas the last statement before commit.
+#
+# rebuild_task_counters() recomputes everything with one GROUP BY
+# (python -m scripts.rebuild_task_stats), e.g. after editing tasks by hand.
+
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Task, TaskCounter, TaskPriority, TaskStatus
+
+TOTAL_KEY = ("total", "all")
+UNASSIGNED = "none"
+
+
+def _counter_keys(status, priority, assignee_id: Optional[int]) -> list[tuple[str, str]]:
+    keys = [TOTAL_KEY, ("assignee", str(assignee_id) if assignee_id is not None else UNASSIGNED)]
+    if status is not None:
+        keys.append(("status", TaskStatus(status).value))
+    if priority is not None:
+        keys.append(("priority", TaskPriority(priority).value))
+    return keys
+
+
+def count_task(deltas: Counter, status, priority, assignee_id: Optional[int], sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) one task with these values to deltas."""
+    for key in _counter_keys(status, priority, assignee_id):
+        deltas[key] += sign
+
+
+def apply_counter_deltas(db: Session, deltas: Counter) -> None:
+    """Add deltas to the stored counters. Doesn't commit - commit with the task change."""
+    # Sorted, so concurrent transactions lock counter rows in the same order
+    rows = [
+        {"dimension": dimension, "value": value, "count": delta}
+        for (dimension, value), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+
+    # The session's actual database, not DATABASE_URL (unset when the URL comes
+    # from Secrets Manager). Imported here so only the dialect in use is loaded.
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    statement = insert(TaskCounter.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=["dimension", "value"],
+        set_={"count": TaskCounter.__table__.c.count + statement.excluded["count"]}
+    )
+    db.execute(statement, rows)
+
+
+def get_task_stats(db: Session) -> dict:
+    """Totals by status, priority and assignee, from the counters."""
+    stats = {
+        "total": 0,
+        "by_status": {status.value: 0 for status in TaskStatus},
+        "by_priority": {priority.value: 0 for priority in TaskPriority},
+        "by_assignee": {},
+    }
+    for dimension, value, count in db.execute(
+        select(TaskCounter.dimension, TaskCounter.value, TaskCounter.count)
+    ):
+        if (dimension, value) == TOTAL_KEY:
+            stats["total"] = count
+        elif dimension == "status":
+            stats["by_status"][value] = count
+        elif dimension == "priority":
+            stats["by_priority"][value] = count
+        elif dimension == "assignee" and count:
+            stats["by_assignee"][value] = count
+    return stats
+
+
+def rebuild_task_counters(db: Session) -> None:
+    """Recompute all counters from the tasks table (one GROUP BY) and commit."""
+    deltas = Counter()
+    groups = db.execute(
+        select(Task.status, Task.priority, Task.assignee_id, func.count())
+        .group_by(Task.status, Task.priority, Task.assignee_id)
+    )
+    for status, priority, assignee_id, count in groups:
+        count_task(deltas, status, priority, assignee_id, sign=count)
+
+    db.query(TaskCounter).delete(synchronize_session=False)
+    apply_counter_deltas(db, deltas)
+    db.commit()
@@ -4,20 +4,126 @@
 # Abstraction layer for file storage. Supports both local storage and S3.
 # This pattern allows switching storage backends without changing the rest of the code.
 
+import functools
+import inspect
 import os
+import threading
+import time
 import uuid
-from typing import Optional, BinaryIO
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Iterator, Optional, BinaryIO
 from abc import ABC, abstractmethod
 
-import boto3
-from botocore.exceptions import ClientError
+import anyio
+from jose import JWTError, jwt
 
+from app.cache import TTLCache
 from app.config import settings
+from app.metrics import Histogram
+
+# boto3 takes a noticeable part of startup to import, so it is only imported
+# when an S3Storage is created (USE_S3=true)
+if TYPE_CHECKING:
+    from botocore.config import Config
+
+# S3 DeleteObjects accepts at most this many keys per call
+DELETE_BATCH_SIZE = 1000
+
+# Uploads are copied in chunks of this size so memory use doesn't grow with file size
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# S3 rejects multipart parts smaller than 5 MB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class FileTooLargeError(Exception):
+    """Raised when an upload exceeds the backend's max_size."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"File exceeds the maximum size of {max_size} bytes")
+
+
+# =============================================================================
+# STORAGE METRICS
+# =============================================================================
+# Every backend's I/O methods are timed for GET /metrics (app/metrics.py),
+# wrapped when the subclass is defined, so a new backend is covered without
+# doing anything. list_files is timed over the whole iteration.
+
+storage_seconds = Histogram(
+    "taskflow_storage_operation_seconds",
+    "Storage backend call duration, by backend, operation and outcome (error: it raised)",
+    ("backend", "operation", "outcome"),
+)
+
+TIMED_OPERATIONS = (
+    "put_file", "upload_file", "delete_file", "delete_files", "list_files",
+    "get_download_url", "get_upload_url", "head_file",
+)
+
+
+def timed_operation(backend: str, operation: str, method):
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def timed_iteration(*args, **kwargs):
+            started, outcome = time.perf_counter(), "error"
+            try:
+                yield from method(*args, **kwargs)
+                outcome = "ok"
+            finally:
+                storage_seconds.observe(time.perf_counter() - started, backend, operation, outcome)
+        return timed_iteration
+
+    @functools.wraps(method)
+    def timed_call(*args, **kwargs):
+        started, outcome = time.perf_counter(), "error"
+        try:
+            result = method(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            storage_seconds.observe(time.perf_counter() - started, backend, operation, outcome)
+    return timed_call
 
 
 class StorageBackend(ABC):
     """Abstract base class for storage backends."""
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # "local", "s3"
+        backend = cls.__name__.removesuffix("Storage").lower()
+        for operation in TIMED_OPERATIONS:
+            method = cls.__dict__.get(operation)
+            if method is not None and not getattr(method, "__isabstractmethod__", False):
+                setattr(cls, operation, timed_operation(backend, operation, method))
+
+    @staticmethod
+    def unique_name(filename: str) -> str:
+        """Prefix a client-supplied filename with a UUID, dropping any directory part."""
+        safe_name = os.path.basename(filename.replace("\\", "/")) or "file"
+        return f"{uuid.uuid4().hex}_{safe_name}"
+
+    @abstractmethod
+    def path_for(self, folder: str, name: str) -> str:
+        """Storage path (local path or S3 key) of `name` inside `folder`."""
+        pass
+
+    def new_file_path(self, filename: str, folder: str) -> str:
+        """Choose a unique storage path for a new file (nothing is written yet)."""
+        return self.path_for(folder, self.unique_name(filename))
+
+    @abstractmethod
+    def put_file(self, file: BinaryIO, file_path: str, content_type: Optional[str] = None) -> int:
+        """
+        Stream a file to an exact storage path and return its size.
+
+        Raises FileTooLargeError like upload_file.
+        """
+        pass
+
     @abstractmethod
     def upload_file(
         self,
@@ -26,7 +132,12 @@ class StorageBackend(ABC):
         folder: str,
         content_type: Optional[str] = None
     ) -> tuple[str, int]:
-        """Upload a file and return (storage_path, file_size)."""
+        """
+        Upload a file and return (storage_path, file_size).
+
+        Raises FileTooLargeError (after cleaning up anything partially
+        written) if the file is larger than the backend's max_size.
+        """
         pass
 
     @abstractmethod
@@ -34,17 +145,49 @@ class StorageBackend(ABC):
         """Delete a file. Returns True if successful."""
         pass
 
+    @abstractmethod
+    def delete_files(self, file_paths: list[str]) -> list[str]:
+        """
+        Delete many files at once. Files that are already gone count as
+        deleted. Returns the paths that could not be deleted.
+        """
+        pass
+
+    @abstractmethod
+    def list_files(self, folder: str) -> Iterator[tuple[str, datetime]]:
+        """Yield (file_path, last modified in UTC) for every file stored under folder."""
+        pass
+
     @abstractmethod
     def get_download_url(self, file_path: str, expires_in: int = 3600) -> str:
         """Get a URL to download the file."""
         pass
 
+    @abstractmethod
+    def get_upload_url(self, file_path: str, content_type: str, expires_in: int = 3600) -> str:
+        """Get a URL the client can PUT the file to directly."""
+        pass
+
+    @abstractmethod
+    def head_file(self, file_path: str) -> Optional[dict]:
+        """
+        Return {"size": int, "content_type": str | None} for a stored file,
+        or None if it doesn't exist.
+        """
+        pass
+
+    def close(self) -> None:
+        """Release clients and connections. Called on application shutdown."""
+        pass
+
 
 class LocalStorage(StorageBackend):
     """Local filesystem storage (for development)."""
 
-    def __init__(self, base_dir: str = "uploads"):
+    def __init__(self, base_dir: str = "uploads", max_size: Optional[int] = None, delete_concurrency: int = 8):
         self.base_dir = base_dir
+        self.max_size = max_size
+        self.delete_concurrency = max(delete_concurrency, 1)
         os.makedirs(base_dir, exist_ok=True)
 
     def upload_file(
@@ -54,21 +197,30 @@ class LocalStorage(StorageBackend):
         folder: str,
         content_type: Optional[str] = None
     ) -> tuple[str, int]:
-        # Create folder
-        folder_path = os.path.join(self.base_dir, folder)
-        os.makedirs(folder_path, exist_ok=True)
-
         # Generate unique filename to avoid collisions
-        unique_filename = f"{uuid.uuid4().hex}_{filename}"
-        file_path = os.path.join(folder_path, unique_filename)
+        file_path = self.new_file_path(filename, folder)
+        file_size = self.put_file(file, file_path, content_type)
+        return file_path, file_size
 
-        # Write file
-        with open(file_path, "wb") as f:
-            content = file.read()
-            f.write(content)
-            file_size = len(content)
+    def put_file(self, file: BinaryIO, file_path: str, content_type: Optional[str] = None) -> int:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-        return file_path, file_size
+        # Stream to disk chunk by chunk
+        file_size = 0
+        try:
+            with open(file_path, "wb") as f:
+                while chunk := file.read(CHUNK_SIZE):
+                    file_size += len(chunk)
+                    if self.max_size and file_size > self.max_size:
+                        raise FileTooLargeError(self.max_size)
+                    f.write(chunk)
+        except BaseException:
+            # Don't leave a partial file behind
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+
+        return file_size
 
     def delete_file(self, file_path: str) -> bool:
         try:
@@ -79,10 +231,96 @@ class LocalStorage(StorageBackend):
         except Exception:
             return False
 
+    @staticmethod
+    def _unlink(file_path: str) -> bool:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False
+        return True
+
+    def delete_files(self, file_paths: list[str]) -> list[str]:
+        # Unlinks block on disk metadata I/O, so overlap them
+        workers = min(self.delete_concurrency, len(file_paths))
+        if workers <= 1:
+            results = map(self._unlink, file_paths)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self._unlink, file_paths))
+        return [path for path, deleted in zip(file_paths, results) if not deleted]
+
+    def list_files(self, folder: str) -> Iterator[tuple[str, datetime]]:
+        for dirpath, _, filenames in os.walk(os.path.join(self.base_dir, folder)):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                try:
+                    mtime = os.path.getmtime(file_path)
+                except OSError:
+                    continue
+                yield file_path, datetime.fromtimestamp(mtime, timezone.utc).replace(tzinfo=None)
+
+    def path_for(self, folder: str, name: str) -> str:
+        return os.path.join(self.base_dir, folder, name)
+
+    # -------------------------------------------------------------------------
+    # Local stand-in for S3 pre-signed URLs
+    # -------------------------------------------------------------------------
+    # The "pre-signed URLs" point at this API (GET /files/{path},
+    # PUT /files/upload) with a signed, expiring token carrying the path (and,
+    # for uploads, the content type) - the same guarantees S3 gives, so the
+    # download and direct-upload flows can be exercised offline.
+
+    @staticmethod
+    def _sign(claims: dict, expires_in: int) -> str:
+        return jwt.encode(
+            {**claims, "exp": datetime.utcnow() + timedelta(seconds=expires_in)},
+            settings.SECRET_KEY,
+            algorithm=settings.ALGORITHM
+        )
+
+    @staticmethod
+    def _verify(token: str, typ: str) -> Optional[dict]:
+        try:
+            claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        return claims if claims.get("typ") == typ else None
+
     def get_download_url(self, file_path: str, expires_in: int = 3600) -> str:
-        # For local storage, return the file path
-        # In a real app, you'd serve this through an endpoint
-        return f"/files/{file_path}"
+        token = self._sign({"typ": "local_download", "path": file_path}, expires_in)
+        return f"/files/{file_path}?token={token}"
+
+    @staticmethod
+    def verify_download_token(token: str, file_path: str) -> bool:
+        """Whether token is an unexpired download token for file_path."""
+        claims = LocalStorage._verify(token, "local_download")
+        return claims is not None and claims.get("path") == file_path
+
+    def get_upload_url(self, file_path: str, content_type: str, expires_in: int = 3600) -> str:
+        token = self._sign(
+            {"typ": "local_upload", "path": file_path, "content_type": content_type},
+            expires_in
+        )
+        return f"/files/upload?token={token}"
+
+    @staticmethod
+    def verify_upload_token(token: str) -> Optional[tuple[str, str]]:
+        """Return (file_path, content_type) for a valid upload token, else None."""
+        claims = LocalStorage._verify(token, "local_upload")
+        if claims is None:
+            return None
+        return claims["path"], claims["content_type"]
+
+    def head_file(self, file_path: str) -> Optional[dict]:
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return None
+        # The filesystem doesn't keep a content type; the upload endpoint
+        # enforces the signed one instead
+        return {"size": size, "content_type": None}
 
 
 class S3Storage(StorageBackend):
@@ -93,25 +331,42 @@ class S3Storage(StorageBackend):
         bucket_name: str,
         region: str = "us-east-1",
         access_key_id: Optional[str] = None,
-        secret_access_key: Optional[str] = None
+        secret_access_key: Optional[str] = None,
+        max_size: Optional[int] = None,
+        part_size: int = 8 * 1024 * 1024,
+        max_concurrency: int = 4,
+        client_config: Optional["Config"] = None
     ):
         self.bucket_name = bucket_name
         self.region = region
+        self.max_size = max_size
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_concurrency = max(max_concurrency, 1)
 
         # Initialize S3 client
         # If credentials not provided, boto3 will use:
         # 1. Environment variables (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY)
         # 2. Shared credentials file (~/.aws/credentials)
         # 3. IAM role (when running on AWS)
+        #
+        # client_config sets the connection pool size, retries and timeouts.
+        # The client is thread-safe and keeps connections alive, so one
+        # instance should be shared by the whole process (see get_storage).
+        import boto3
+
         if access_key_id and secret_access_key:
             self.s3_client = boto3.client(
                 "s3",
                 region_name=region,
                 aws_access_key_id=access_key_id,
-                aws_secret_access_key=secret_access_key
+                aws_secret_access_key=secret_access_key,
+                config=client_config
             )
         else:
-            self.s3_client = boto3.client("s3", region_name=region)
+            self.s3_client = boto3.client("s3", region_name=region, config=client_config)
+
+    def close(self) -> None:
+        self.s3_client.close()
 
     def upload_file(
         self,
@@ -121,29 +376,110 @@ class S3Storage(StorageBackend):
         content_type: Optional[str] = None
     ) -> tuple[str, int]:
         # Generate unique key (path in S3)
-        unique_filename = f"{uuid.uuid4().hex}_{filename}"
-        s3_key = f"{folder}/{unique_filename}"
-
-        # Read file content to get size
-        content = file.read()
-        file_size = len(content)
-
-        # Reset file pointer
-        file.seek(0)
+        s3_key = self.new_file_path(filename, folder)
+        file_size = self.put_file(file, s3_key, content_type)
+        return s3_key, file_size
 
-        # Upload to S3
+    def put_file(self, file: BinaryIO, file_path: str, content_type: Optional[str] = None) -> int:
+        s3_key = file_path
         extra_args = {}
         if content_type:
             extra_args["ContentType"] = content_type
 
-        self.s3_client.put_object(
+        # Small files go up in a single PUT; anything bigger than one part
+        # is streamed as a multipart upload so it is never fully in memory
+        first_part = file.read(self.part_size)
+        if len(first_part) < self.part_size:
+            if self.max_size and len(first_part) > self.max_size:
+                raise FileTooLargeError(self.max_size)
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Body=first_part,
+                **extra_args
+            )
+            return len(first_part)
+
+        return self._multipart_upload(file, s3_key, first_part, extra_args)
+
+    def _upload_part(self, s3_key: str, upload_id: str, part_number: int, data: bytes) -> dict:
+        response = self.s3_client.upload_part(
             Bucket=self.bucket_name,
             Key=s3_key,
-            Body=content,
-            **extra_args
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data
         )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
 
-        return s3_key, file_size
+    def _multipart_upload(self, file: BinaryIO, s3_key: str, first_part: bytes, extra_args: dict) -> int:
+        """
+        Upload parts in parallel, holding at most max_concurrency parts in memory.
+
+        On any failure (including the size limit) the multipart upload is
+        aborted so S3 discards the parts already stored.
+        """
+        upload_id = self.s3_client.create_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            **extra_args
+        )["UploadId"]
+
+        parts = []
+        file_size = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                pending = set()
+                part_number = 1
+                data = first_part
+                while data:
+                    file_size += len(data)
+                    if self.max_size and file_size > self.max_size:
+                        raise FileTooLargeError(self.max_size)
+
+                    # Wait for a slot before reading more, bounding memory use
+                    if len(pending) >= self.max_concurrency:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        parts.extend(future.result() for future in done)
+
+                    pending.add(pool.submit(self._upload_part, s3_key, upload_id, part_number, data))
+                    part_number += 1
+                    data = file.read(self.part_size)
+
+                parts.extend(future.result() for future in pending)
+
+            parts.sort(key=lambda part: part["PartNumber"])
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                UploadId=upload_id
+            )
+            raise
+
+        return file_size
+
+    def path_for(self, folder: str, name: str) -> str:
+        return f"{folder}/{name}"
+
+    def head_file(self, file_path: str) -> Optional[dict]:
+        try:
+            response = self.s3_client.head_object(
+                Bucket=self.bucket_name,
+                Key=file_path
+            )
+        except self.s3_client.exceptions.ClientError:
+            return None
+        return {
+            "size": response["ContentLength"],
+            "content_type": response.get("ContentType"),
+        }
 
     def delete_file(self, file_path: str) -> bool:
         try:
@@ -152,9 +488,33 @@ class S3Storage(StorageBackend):
                 Key=file_path
             )
             return True
-        except ClientError:
+        except self.s3_client.exceptions.ClientError:
             return False
 
+    def delete_files(self, file_paths: list[str]) -> list[str]:
+        """One DeleteObjects call per 1000 keys instead of a request per key."""
+        failed = []
+        for i in range(0, len(file_paths), DELETE_BATCH_SIZE):
+            batch = file_paths[i:i + DELETE_BATCH_SIZE]
+            try:
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+                )
+            except self.s3_client.exceptions.ClientError:
+                failed.extend(batch)
+                continue
+            # Quiet mode only reports the keys that failed
+            failed.extend(error["Key"] for error in response.get("Errors", []))
+        return failed
+
+    def list_files(self, folder: str) -> Iterator[tuple[str, datetime]]:
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=f"{folder}/"):
+            for obj in page.get("Contents", []):
+                last_modified = obj["LastModified"].astimezone(timezone.utc).replace(tzinfo=None)
+                yield obj["Key"], last_modified
+
     def get_download_url(self, file_path: str, expires_in: int = 3600) -> str:
         """
         Generate a pre-signed URL for downloading.
@@ -172,7 +532,7 @@ class S3Storage(StorageBackend):
                 ExpiresIn=expires_in
             )
             return url
-        except ClientError:
+        except self.s3_client.exceptions.ClientError:
             return ""
 
     def get_upload_url(self, file_path: str, content_type: str, expires_in: int = 3600) -> str:
@@ -193,20 +553,216 @@ class S3Storage(StorageBackend):
                 ExpiresIn=expires_in
             )
             return url
-        except ClientError:
+        except self.s3_client.exceptions.ClientError:
             return ""
 
 
-def get_storage() -> StorageBackend:
+def create_storage() -> StorageBackend:
     """
-    Factory function to get the appropriate storage backend.
+    Factory function to build the appropriate storage backend.
     Uses S3 if USE_S3=true and bucket is configured, otherwise local storage.
     """
     if settings.USE_S3 and settings.AWS_S3_BUCKET:
+        from botocore.config import Config
+
         return S3Storage(
             bucket_name=settings.AWS_S3_BUCKET,
             region=settings.AWS_REGION,
             access_key_id=settings.AWS_ACCESS_KEY_ID,
-            secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+            secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            max_size=settings.max_upload_size,
+            part_size=settings.S3_MULTIPART_PART_SIZE_MB * 1024 * 1024,
+            max_concurrency=settings.S3_MULTIPART_CONCURRENCY,
+            client_config=Config(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                retries={"max_attempts": settings.S3_MAX_ATTEMPTS, "mode": "standard"},
+                connect_timeout=settings.S3_CONNECT_TIMEOUT,
+                read_timeout=settings.S3_READ_TIMEOUT
+            )
         )
-    return LocalStorage()
+    return LocalStorage(
+        max_size=settings.max_upload_size,
+        delete_concurrency=settings.DELETION_CONCURRENCY
+    )
+
+
+# =============================================================================
+# PROCESS-WIDE BACKEND
+# =============================================================================
+# Building an S3Storage means a new boto3 client: config loading, credential
+# resolution and a fresh TLS connection on first use. The backend is created
+# once at startup (main.py lifespan) and shared by every request.
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+
+def init_storage() -> StorageBackend:
+    """Create the shared backend (idempotent)."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = create_storage()
+        return _storage
+
+
+def close_storage() -> None:
+    """Close and drop the shared backend."""
+    global _storage
+    with _storage_lock:
+        if _storage is not None:
+            _storage.close()
+            _storage = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    Get the shared storage backend.
+
+    Normally created by the app's lifespan; scripts and tests that never
+    start the app get it created lazily on first use.
+    """
+    return _storage or init_storage()
+
+
+# =============================================================================
+# ASYNC STORAGE
+# =============================================================================
+# Async endpoints must not call the blocking backends above directly: a disk
+# or S3 write would stall the event loop and every other request on the
+# worker. AsyncStorage runs the same backend calls in worker threads.
+#
+# The threads come from a dedicated limiter (STORAGE_MAX_THREADS), not
+# Starlette's shared threadpool, so slow uploads can't starve sync endpoints.
+# boto3 has no native async API; its clients are thread-safe, so this works
+# for both LocalStorage and S3Storage.
+
+class AsyncStorageBackend(ABC):
+    """Async counterpart of StorageBackend."""
+
+    @abstractmethod
+    async def upload_file(
+        self,
+        file: BinaryIO,
+        filename: str,
+        folder: str,
+        content_type: Optional[str] = None
+    ) -> tuple[str, int]:
+        """Upload a file and return (storage_path, file_size)."""
+        pass
+
+    @abstractmethod
+    async def put_file(self, file: BinaryIO, file_path: str, content_type: Optional[str] = None) -> int:
+        """Stream a file to an exact storage path and return its size."""
+        pass
+
+    @abstractmethod
+    async def delete_file(self, file_path: str) -> bool:
+        """Delete a file. Returns True if successful."""
+        pass
+
+    @abstractmethod
+    async def get_download_url(self, file_path: str, expires_in: int = 3600) -> str:
+        """Get a URL to download the file."""
+        pass
+
+    @abstractmethod
+    async def get_upload_url(self, file_path: str, content_type: str, expires_in: int = 3600) -> str:
+        """Get a pre-signed URL to PUT the file to."""
+        pass
+
+    @abstractmethod
+    async def head_file(self, file_path: str) -> Optional[dict]:
+        """Size and content type of a stored file, or None if it doesn't exist."""
+        pass
+
+
+class AsyncStorage(AsyncStorageBackend):
+    """Runs a (blocking) StorageBackend's calls in a bounded set of threads."""
+
+    def __init__(self, backend: StorageBackend, max_threads: int = 16):
+        self.backend = backend
+        self.max_threads = max_threads
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+
+    async def _run(self, fn, *args):
+        # Created on first use, inside the event loop
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.max_threads)
+        return await anyio.to_thread.run_sync(fn, *args, limiter=self._limiter)
+
+    async def upload_file(
+        self,
+        file: BinaryIO,
+        filename: str,
+        folder: str,
+        content_type: Optional[str] = None
+    ) -> tuple[str, int]:
+        return await self._run(self.backend.upload_file, file, filename, folder, content_type)
+
+    async def put_file(self, file: BinaryIO, file_path: str, content_type: Optional[str] = None) -> int:
+        return await self._run(self.backend.put_file, file, file_path, content_type)
+
+    async def delete_file(self, file_path: str) -> bool:
+        return await self._run(self.backend.delete_file, file_path)
+
+    async def get_download_url(self, file_path: str, expires_in: int = 3600) -> str:
+        return await self._run(self.backend.get_download_url, file_path, expires_in)
+
+    async def get_upload_url(self, file_path: str, content_type: str, expires_in: int = 3600) -> str:
+        return await self._run(self.backend.get_upload_url, file_path, content_type, expires_in)
+
+    async def head_file(self, file_path: str) -> Optional[dict]:
+        return await self._run(self.backend.head_file, file_path)
+
+
+_async_storage: Optional[AsyncStorage] = None
+
+
+def get_async_storage() -> AsyncStorage:
+    """Get the async wrapper around the shared storage backend."""
+    global _async_storage
+    storage = get_storage()
+    if _async_storage is None or _async_storage.backend is not storage:
+        _async_storage = AsyncStorage(storage, max_threads=settings.STORAGE_MAX_THREADS)
+    return _async_storage
+
+
+# =============================================================================
+# PRE-SIGNED DOWNLOAD URL CACHE
+# =============================================================================
+# Signing a URL is pure CPU, but popular attachments are fetched over and
+# over. URLs are cached by file_path for half their lifetime, so a cached URL
+# always has at least DOWNLOAD_URL_EXPIRES / 2 seconds left when handed out.
+
+download_url_cache = TTLCache(
+    maxsize=settings.DOWNLOAD_URL_CACHE_SIZE,
+    ttl=settings.DOWNLOAD_URL_EXPIRES // 2,
+)
+
+
+def get_cached_download_url(file_path: str) -> str:
+    """Get a download URL for a file, re-signing only when the cached one is stale."""
+    url = download_url_cache.get(file_path)
+    if url is None:
+        url = get_storage().get_download_url(file_path, expires_in=settings.DOWNLOAD_URL_EXPIRES)
+        if url:
+            download_url_cache.set(file_path, url)
+    return url
+
+
+async def get_cached_download_url_async(file_path: str) -> str:
+    """Async version of get_cached_download_url (signs off the event loop)."""
+    url = download_url_cache.get(file_path)
+    if url is None:
+        url = await get_async_storage().get_download_url(
+            file_path, expires_in=settings.DOWNLOAD_URL_EXPIRES
+        )
+        if url:
+            download_url_cache.set(file_path, url)
+    return url
+
+
+def invalidate_download_url(file_path: str) -> None:
+    """Drop a cached URL (call when the file is deleted)."""
+    download_url_cache.invalidate(file_path)
@@ -0,0 +1,117 @@
+# =============================================================================
+# BENCHMARK: list serialization, ORM + Pydantic vs rows + orjson
+# =============================================================================
+# Times one page of GET /tasks (query + serialization) both ways:
+#
+#   response_model  ORM objects (assignee joined-loaded), validated through
+#                   List[TaskListResponse] and dumped to JSON - what FastAPI
+#                   does for a route that returns ORM objects
+#   fast path       app/serialization.py: plain column rows, dicts, orjson
+#
+# and checks that both produce exactly the same bytes.
+#
+# Usage (from the backend/ directory):
+#   python -m scripts.bench_list_serialization
+#   python -m scripts.bench_list_serialization --tasks 20000 --page-size 100 -n 300
+#
+# Uses a throwaway SQLite database in a temp directory.
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def run(label: str, iterations: int, fn) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_page_ms = (time.perf_counter() - start) / iterations * 1000
+    print(f"{label:<18} {per_page_ms:8.3f} ms/page")
+    return per_page_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ORM + Pydantic vs rows + orjson for GET /tasks")
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # Settings are read at import time, so point the app at a temp database first
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert
+    from sqlalchemy.orm import joinedload
+
+    from app.database import Base, SessionLocal, init_engines
+    from app.models import Task, TaskPriority, TaskStatus, User
+    from app.pagination import keyset_paginate
+    from app.schemas import TaskListResponse
+    from app.serialization import task_list_item, task_list_query
+    import orjson
+
+    engine = init_engines()
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    statuses, priorities = list(TaskStatus), list(TaskPriority)
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {"email": f"user{i}@example.com", "username": f"user{i}", "hashed_password": "x", "created_at": now}
+            for i in range(args.users)
+        ])
+        db.execute(insert(Task), [
+            {
+                "title": f"Task {i} – ünïcode",
+                "description": "benchmark",
+                "status": statuses[i % 3],
+                "priority": priorities[i % 3],
+                # Whole seconds too: both paths must drop the zero microseconds
+                "due_date": now.replace(microsecond=0) + timedelta(days=i) if i % 4 else None,
+                "created_at": now - timedelta(seconds=i),
+                "creator_id": 1,
+                "assignee_id": (i % args.users) + 1 if i % 5 else None,
+            }
+            for i in range(args.tasks)
+        ])
+        db.commit()
+
+    adapter = TypeAdapter(list[TaskListResponse])
+    db = SessionLocal()
+
+    def response_model_path() -> bytes:
+        query = db.query(Task).options(joinedload(Task.assignee))
+        tasks = keyset_paginate(query, Task, None, args.page_size).all()[:args.page_size]
+        body = adapter.dump_json(adapter.validate_python(tasks, from_attributes=True))
+        db.expunge_all()  # a request starts with an empty session
+        return body
+
+    def fast_path() -> bytes:
+        rows = keyset_paginate(task_list_query(db), Task, None, args.page_size).all()[:args.page_size]
+        return orjson.dumps([task_list_item(row) for row in rows])
+
+    # Byte-for-byte check, also against FastAPI's older jsonable_encoder path
+    expected = response_model_path()
+    legacy = json.dumps(
+        jsonable_encoder(adapter.validate_json(expected)), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    actual = fast_path()
+    assert actual == expected, "fast path output differs from response_model output"
+    assert actual == legacy, "fast path output differs from jsonable_encoder output"
+    print(f"identical output ({len(actual)} bytes for {args.page_size} tasks)\n")
+
+    slow = run("response_model", args.iterations, response_model_path)
+    fast = run("fast path", args.iterations, fast_path)
+    print(f"{'saving':<18} {slow - fast:8.3f} ms/page ({slow / fast:.1f}x)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# =============================================================================
+# BENCHMARK: SQLite under concurrent reads and writes, default vs tuned
+# =============================================================================
+# Runs the same mixed workload against a fresh SQLite file twice:
+#
+#   default   today's setup: one engine, rollback journal, pysqlite defaults
+#   tuned     SQLITE_TUNED=true (app/database.py): WAL, per-connection
+#             PRAGMAs, one writer connection (BEGIN IMMEDIATE), query_only
+#             reader pool
+#
+# Writer threads create a task and update the stats counters in one
+# transaction (what POST /tasks does); reader threads fetch a page of
+# GET /tasks. Each operation uses its own session, as a request would, and
+# each thread pauses --think-ms between operations, like a client (a
+# zero-gap loop just measures which thread wins the next lock). The
+# threads are spread over --processes processes, like uvicorn workers.
+# Reports throughput, latency percentiles and "database is locked" errors.
+#
+# Usage (from the backend/ directory):
+#   python -m scripts.bench_sqlite_concurrency
+#   python -m scripts.bench_sqlite_concurrency --processes 4 --writers 4 --readers 8 --seconds 10
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_process(db_url: str, tuned: bool, args: argparse.Namespace) -> tuple[dict, Counter]:
+    """One worker process: its own engines, args.writers + args.readers threads."""
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+
+    from app.config import settings
+    from app.database import create_db_engine
+    from app.models import Task
+    from app.pagination import keyset_paginate
+    from app.serialization import task_list_item, task_list_query
+    from app.stats import apply_counter_deltas, count_task
+
+    settings.SQLITE_TUNED = tuned
+    writer = create_db_engine(db_url)
+    reader = create_db_engine(db_url, read_only=True) if tuned else writer
+    WriteSession = sessionmaker(autoflush=False, bind=writer)
+    ReadSession = sessionmaker(autoflush=False, bind=reader)
+
+    deadline = time.perf_counter() + args.seconds
+    latencies = {"write": [], "read": []}
+    errors = Counter()
+    lock = threading.Lock()
+
+    def write_once(i: int) -> None:
+        with WriteSession() as db:
+            task = Task(title=f"bench {i}", creator_id=1, assignee_id=(i % 20) + 1)
+            db.add(task)
+            db.flush()
+            deltas = Counter()
+            count_task(deltas, task.status, task.priority, task.assignee_id)
+            apply_counter_deltas(db, deltas)
+            db.commit()
+
+    def read_once(i: int) -> None:
+        with ReadSession() as db:
+            rows = keyset_paginate(task_list_query(db), Task, None, 20).all()
+            [task_list_item(row) for row in rows]
+
+    def worker(kind: str, operation) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                operation(i)
+            except OperationalError as error:
+                with lock:
+                    errors[f"{kind}: {error.orig}"] += 1
+            else:
+                with lock:
+                    latencies[kind].append((time.perf_counter() - start) * 1000)
+            i += 1
+            time.sleep(args.think_ms / 1000)
+
+    threads = [threading.Thread(target=worker, args=("write", write_once)) for _ in range(args.writers)]
+    threads += [threading.Thread(target=worker, args=("read", read_once)) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.dispose()
+    reader.dispose()
+    return latencies, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite concurrency: default vs SQLITE_TUNED")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--writers", type=int, default=4, help="writer threads per process")
+    parser.add_argument("--readers", type=int, default=8, help="reader threads per process")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--think-ms", type=float, default=5, help="pause between a thread's operations")
+    parser.add_argument("--tasks", type=int, default=2000, help="tasks to seed before timing")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so point the app at a temp database first
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/unused.db"
+
+    from sqlalchemy import insert
+
+    from app.config import settings
+    from app.database import Base, SessionLocal, create_db_engine
+    from app.models import Task, User
+    from app.stats import rebuild_task_counters
+
+    print(
+        f"{args.processes} process(es) x ({args.writers} writer + {args.readers} reader threads), "
+        f"{args.seconds:g}s each\n"
+    )
+    for name, tuned in (("default", False), ("tuned", True)):
+        db_url = f"sqlite:///{workdir}/{name}.db"
+        settings.SQLITE_TUNED = tuned
+        seed_engine = create_db_engine(db_url)
+        Base.metadata.create_all(bind=seed_engine)
+        with SessionLocal(bind=seed_engine) as db:
+            db.execute(insert(User), [
+                {"email": f"user{i}@example.com", "username": f"user{i}", "hashed_password": "x"}
+                for i in range(20)
+            ])
+            db.execute(insert(Task), [
+                {"title": f"Task {i}", "creator_id": 1, "assignee_id": (i % 20) + 1}
+                for i in range(args.tasks)
+            ])
+            db.commit()
+            rebuild_task_counters(db)
+        seed_engine.dispose()
+
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.starmap(run_process, [(db_url, tuned, args)] * args.processes)
+
+        latencies = {"write": [], "read": []}
+        errors = Counter()
+        for process_latencies, process_errors in results:
+            for kind, values in process_latencies.items():
+                latencies[kind].extend(values)
+            errors.update(process_errors)
+
+        print(name)
+        for kind in ("write", "read"):
+            values = latencies[kind]
+            print(
+                f"  {kind:<6} {len(values) / args.seconds:9.0f} ops/s"
+                f"   p50 {percentile(values, 0.5):7.2f} ms"
+                f"   p99 {percentile(values, 0.99):8.2f} ms"
+                f"   max {max(values, default=0):8.2f} ms"
+            )
+        for message, count in errors.most_common():
+            print(f"  error  {count:6d} x {message}")
+        if not errors:
+            print("  errors      none")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# =============================================================================
+# BENCHMARK: import and startup time (cold start)
+# =============================================================================
+# How long a fresh process takes before it can serve requests, which is what
+# a new container on scale-out waits for. Each run is a new Python process
+# that imports app.main and enters the app's lifespan (engines, storage,
+# background workers), against a scratch SQLite database migrated up front.
+# Reports the median of --runs for:
+#
+#   process   wall time from spawning the interpreter until startup is done
+#   import    import app.main
+#   startup   the lifespan, up to the point the app would accept requests
+#
+# and lists heavy optional modules that were imported although the
+# configuration doesn't use them (boto3 with USE_S3=false, ...).
+#
+# For CI: --json prints the numbers as one JSON object, and --max-import-ms /
+# --max-startup-ms make the script exit non-zero when a median is over budget.
+#
+# Usage (from the backend/ directory):
+#   python -m scripts.bench_startup
+#   python -m scripts.bench_startup --runs 10 --json --max-import-ms 1500
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Only needed with optional settings (USE_S3, USE_SECRETS_MANAGER, DB_ASYNC)
+OPTIONAL_MODULES = ("boto3", "botocore", "asyncpg", "aiosqlite")
+
+
+def child() -> None:
+    """One cold start, timed from inside the new process."""
+    import asyncio
+
+    start = time.perf_counter()
+    from app.main import app, lifespan
+    imported = time.perf_counter()
+
+    timings = {}
+
+    async def start_app() -> None:
+        async with lifespan(app):
+            timings["startup"] = time.perf_counter() - imported
+
+    asyncio.run(start_app())
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "startup_ms": timings["startup"] * 1000,
+        "optional_modules": [name for name in OPTIONAL_MODULES if name in sys.modules],
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import and startup time of the app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print one JSON object (for CI)")
+    parser.add_argument("--max-import-ms", type=float, help="fail if the median import time is higher")
+    parser.add_argument("--max-startup-ms", type=float, help="fail if the median startup time is higher")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/startup.db", PYTHONPATH=backend)
+    # The schema is a deploy step, not part of startup: migrate once, up front
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=backend, env=env, check=True, capture_output=True
+    )
+
+    runs = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-m", "scripts.bench_startup", "--child"],
+            cwd=workdir, env=env, check=True, capture_output=True, text=True
+        )
+        process_ms = (time.perf_counter() - start) * 1000
+        runs.append(dict(json.loads(result.stdout.splitlines()[-1]), process_ms=process_ms))
+
+    report = {
+        name: round(statistics.median(run[name] for run in runs), 1)
+        for name in ("process_ms", "import_ms", "startup_ms")
+    }
+    report["runs"] = args.runs
+    report["optional_modules"] = runs[-1]["optional_modules"]
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"median of {args.runs} cold starts")
+        print(f"  process  {report['process_ms']:8.1f} ms")
+        print(f"  import   {report['import_ms']:8.1f} ms")
+        print(f"  startup  {report['startup_ms']:8.1f} ms")
+        print(f"  optional modules imported: {', '.join(report['optional_modules']) or 'none'}")
+
+    failed = []
+    if args.max_import_ms is not None and report["import_ms"] > args.max_import_ms:
+        failed.append(f"import {report['import_ms']} ms > {args.max_import_ms} ms")
+    if args.max_startup_ms is not None and report["startup_ms"] > args.max_startup_ms:
+        failed.append(f"startup {report['startup_ms']} ms > {args.max_startup_ms} ms")
+    if failed:
+        sys.exit("Over budget: " + "; ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# =============================================================================
+# BENCHMARK: per-request vs shared S3 storage backend
+# =============================================================================
+# Compares building a new S3Storage (and boto3 client) for every request with
+# reusing the process-wide backend from get_storage().
+#
+# Usage (from the backend/ directory):
+#   python -m scripts.bench_storage_client                  # offline: presign only
+#   python -m scripts.bench_storage_client --bucket NAME    # + HEAD round trips
+#
+# Offline mode measures client construction and credential resolution, using
+# dummy credentials if none are configured. With --bucket each iteration also
+# makes a HEAD request, which adds the TLS handshake a new client has to redo.
+
+import argparse
+import os
+import time
+
+
+def run(label: str, iterations: int, make_request) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        make_request()
+    elapsed = time.perf_counter() - start
+    per_request_ms = elapsed / iterations * 1000
+    print(f"{label:<24} {per_request_ms:8.3f} ms/request")
+    return per_request_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-request vs shared S3 client")
+    parser.add_argument("--bucket", help="real bucket to HEAD (network mode)")
+    parser.add_argument("--region", default=os.environ.get("AWS_REGION", "us-east-1"))
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    if not args.bucket:
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+    # Settings are read at import time, so configure S3 before importing the app
+    os.environ["USE_S3"] = "true"
+    os.environ["AWS_S3_BUCKET"] = args.bucket or "benchmark-bucket"
+    os.environ["AWS_REGION"] = args.region
+    from app.storage import create_storage
+
+    key = "benchmark/missing-object"
+
+    def request(storage) -> None:
+        storage.get_download_url(key)
+        if args.bucket:
+            storage.head_file(key)
+
+    per_request = run(
+        "new client per request",
+        args.iterations,
+        lambda: request(create_storage()),
+    )
+    shared = create_storage()
+    request(shared)  # warm up the connection
+    reused = run(
+        "shared client",
+        args.iterations,
+        lambda: request(shared),
+    )
+    shared.close()
+
+    print(f"{'saving':<24} {per_request - reused:8.3f} ms/request ({per_request / reused:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# =============================================================================
+# REBUILD TASK STATISTICS
+# =============================================================================
+# Recomputes the task_counters table behind GET /tasks/stats from the tasks
+# table, with one GROUP BY. The API keeps the counters up to date itself;
+# run this after changing tasks outside the API (manual SQL, restores).
+#
+# Usage (from the backend/ directory):
+#   python -m scripts.rebuild_task_stats
+
+from app.database import SessionLocal, init_engines
+from app.stats import get_task_stats, rebuild_task_counters
+
+
+def main() -> None:
+    init_engines()
+    db = SessionLocal()
+    try:
+        rebuild_task_counters(db)
+        stats = get_task_stats(db)
+    finally:
+        db.close()
+
+    print(f"total       {stats['total']}")
+    for name in ("by_status", "by_priority", "by_assignee"):
+        counts = ", ".join(f"{value}={count}" for value, count in stats[name].items())
+        print(f"{name:<11} {counts}")
+
+
+if __name__ == "__main__":
+    main()
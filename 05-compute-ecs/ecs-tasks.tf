@@ -107,6 +107,62 @@ resource "aws_ecs_task_definition" "backend" {
   }
 }
 
+# -----------------------------------------------------------------------------
+# Database Migration Task Definition
+# -----------------------------------------------------------------------------
+# The backend never creates or alters tables itself: the schema comes from
+# Alembic. This one-off task runs `alembic upgrade head` with the backend
+# image and the same database settings. Run it (see README / the ecs_summary
+# output) before the backend service starts a new image. It has no service:
+# it runs once and exits.
+
+resource "aws_ecs_task_definition" "migrate" {
+  family                   = "${var.project_name}-${var.environment}-migrate"
+  network_mode             = "awsvpc"
+  requires_compatibilities = ["FARGATE"]
+  cpu                      = var.backend_cpu
+  memory                   = var.backend_memory
+  execution_role_arn       = data.aws_iam_role.ecs_task_execution.arn
+  task_role_arn            = data.aws_iam_role.ecs_task.arn
+
+  container_definitions = jsonencode([
+    {
+      name      = "migrate"
+      image     = "${var.backend_repository_url}:latest"
+      essential = true
+      command   = ["alembic", "upgrade", "head"]
+
+      environment = [
+        {
+          name  = "USE_SECRETS_MANAGER"
+          value = "true"
+        },
+        {
+          name  = "DB_SECRET_NAME"
+          value = "${var.project_name}-${var.environment}-db-credentials"
+        },
+        {
+          name  = "AWS_REGION"
+          value = var.aws_region
+        }
+      ]
+
+      logConfiguration = {
+        logDriver = "awslogs"
+        options = {
+          "awslogs-group"         = aws_cloudwatch_log_group.backend.name
+          "awslogs-region"        = var.aws_region
+          "awslogs-stream-prefix" = "migrate"
+        }
+      }
+    }
+  ])
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-migrate-task"
+  }
+}
+
 # -----------------------------------------------------------------------------
 # Frontend Task Definition
 # -----------------------------------------------------------------------------
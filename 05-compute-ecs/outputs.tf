@@ -37,6 +37,11 @@ output "backend_task_definition" {
   value       = aws_ecs_task_definition.backend.arn
 }
 
+output "migrate_task_definition" {
+  description = "Database migration (alembic upgrade head) task definition ARN"
+  value       = aws_ecs_task_definition.migrate.arn
+}
+
 output "frontend_task_definition" {
   description = "Frontend task definition ARN"
   value       = aws_ecs_task_definition.frontend.arn
@@ -71,6 +76,11 @@ output "ecs_summary" {
       Backend:  ${aws_ecs_service.backend.name} (${var.backend_desired_count} tasks)
       Frontend: ${aws_ecs_service.frontend.name} (${var.frontend_desired_count} tasks)
 
+    Run Database Migrations (before each backend deploy):
+      aws ecs run-task --cluster ${aws_ecs_cluster.main.name} \
+        --task-definition ${aws_ecs_task_definition.migrate.family} --launch-type FARGATE \
+        --network-configuration "awsvpcConfiguration={subnets=[${join(",", var.private_subnet_ids)}],securityGroups=[${var.app_security_group_id}],assignPublicIp=DISABLED}"
+
     View Logs:
       Backend:  aws logs tail /ecs/${var.project_name}-${var.environment}/backend --follow
       Frontend: aws logs tail /ecs/${var.project_name}-${var.environment}/frontend --follow